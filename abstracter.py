@@ -1,18 +1,28 @@
 import sys
+import time
 import random
-import math
-import colorsys
-import numpy as np
+import argparse
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QPushButton, QLabel, QSlider, QCheckBox, QFileDialog, QComboBox,
-    QGroupBox, QSpinBox, QDoubleSpinBox, QColorDialog, QTabWidget
+    QGroupBox, QSpinBox, QColorDialog, QTabWidget
 )
-from PyQt5.QtGui import (
-    QPainter, QColor, QPixmap, QPolygonF, QPainterPath, QBrush, QPen,
-    QLinearGradient, QRadialGradient, QConicalGradient, QImage, QFont
-)
-from PyQt5.QtCore import Qt, QPointF, QSize
+from PyQt5.QtGui import QPixmap, QFont
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
+
+from settings import RenderSettings, DEFAULT_COLORS, SHAPES, DENSE_KINDS
+from renderer import ArtRenderer
+from cache import RenderCache, default_cache_dir
+from workers import RenderJob, RenderSignals, ExportJob, ExportSignals
+from export import ExportOptions, export_format, MIN_QUALITY, MAX_QUALITY
+from profiler import summarize
+from gallery import SeedGallery, GALLERY_SEEDS
+import animation
+import batch
+import server
+import tiling
+
+COMMANDS = ("batch", "tiled", "animate", "serve")
 
 
 class AbstractArtGenerator(QMainWindow):
@@ -23,11 +33,39 @@ class AbstractArtGenerator(QMainWindow):
         self.canvas_height = 600
 
         # Initialize with some colors
-        self.colors = ["#FF5733", "#33FF57", "#3357FF", "#F3FF33", "#FF33F3", "#33FFF3"]
+        self.colors = list(DEFAULT_COLORS)
         self.selected_colors = []
         self.shape_checkboxes = {}
-        self.last_pixmap = None
+        self.last_image = None
+        self.gallery = None
         self.random_seed = 42
+        self.bg_color = "#FFFFFF"
+        # Finished renders are cached so revisiting a seed or setting shows up instantly
+        self.render_cache = RenderCache(disk_dir=default_cache_dir())
+        self.renderer = ArtRenderer(result_cache=self.render_cache)
+
+        # Renders run on a single worker thread; a newer request cancels older ones
+        self.render_generation = 0
+        self.render_pool = QThreadPool(self)
+        self.render_pool.setMaxThreadCount(1)
+        self.render_signals = RenderSignals()
+        self.render_signals.preview.connect(self.on_render_preview)
+        self.render_signals.finished.connect(self.on_render_finished)
+        self.render_signals.failed.connect(self.on_render_failed)
+
+        # Saving encodes on its own thread, so large files never stall the window
+        self.export_pool = QThreadPool(self)
+        self.export_pool.setMaxThreadCount(1)
+        self.export_signals = ExportSignals()
+        self.export_signals.progress.connect(self.on_export_progress)
+        self.export_signals.finished.connect(self.on_export_finished)
+        self.export_signals.failed.connect(self.on_export_failed)
+
+        # Debounce parameter changes so dragging a slider renders once it settles
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(150)
+        self.render_timer.timeout.connect(self.render_art)
 
         # Create main layout
         self.central_widget = QWidget()
@@ -55,7 +93,10 @@ class AbstractArtGenerator(QMainWindow):
         self.status_bar = self.statusBar()
         self.status_bar.showMessage("Ready")
 
-        # Render initial art
+        # Re-render automatically when any parameter changes
+        self.connect_auto_render()
+
+        # Render initial art in the background so the window shows right away
         self.render_art()
 
     def create_color_tab(self):
@@ -151,8 +192,7 @@ class AbstractArtGenerator(QMainWindow):
         shape_layout = QVBoxLayout()
 
         # Available shapes - use "rotated_rect" instead of "rect"
-        self.shapes = ["rotated_rect", "ellipse", "polygon", "spiral", "bezier", "star", "arc", "donut", "cross",
-                       "line", "text"]
+        self.shapes = list(SHAPES)
 
         # Create checkboxes for each shape
         shape_grid = QGridLayout()
@@ -358,6 +398,34 @@ class AbstractArtGenerator(QMainWindow):
         complexity_group.setLayout(complexity_layout)
         layout.addWidget(complexity_group)
 
+        # High-count mode
+        dense_group = QGroupBox("High-Count Mode")
+        dense_layout = QGridLayout()
+
+        self.dense_checkbox = QCheckBox("Millions of Small Primitives")
+        dense_layout.addWidget(self.dense_checkbox, 0, 0, 1, 2)
+
+        dense_layout.addWidget(QLabel("Primitives:"), 1, 0)
+        self.dense_count_spin = QSpinBox()
+        self.dense_count_spin.setRange(10000, 5000000)
+        self.dense_count_spin.setSingleStep(100000)
+        self.dense_count_spin.setValue(1000000)
+        dense_layout.addWidget(self.dense_count_spin, 1, 1)
+
+        dense_layout.addWidget(QLabel("Primitive:"), 2, 0)
+        self.dense_kind_combo = QComboBox()
+        self.dense_kind_combo.addItems(DENSE_KINDS)
+        dense_layout.addWidget(self.dense_kind_combo, 2, 1)
+
+        dense_layout.addWidget(QLabel("Max Size:"), 3, 0)
+        self.dense_size_spin = QSpinBox()
+        self.dense_size_spin.setRange(1, 8)
+        self.dense_size_spin.setValue(3)
+        dense_layout.addWidget(self.dense_size_spin, 3, 1)
+
+        dense_group.setLayout(dense_layout)
+        layout.addWidget(dense_group)
+
         # Randomness
         random_group = QGroupBox("Randomness")
         random_layout = QGridLayout()
@@ -370,7 +438,12 @@ class AbstractArtGenerator(QMainWindow):
 
         self.random_seed_button = QPushButton("Random Seed")
         self.random_seed_button.clicked.connect(self.set_random_seed)
-        random_layout.addWidget(self.random_seed_button, 1, 0, 1, 2)
+        random_layout.addWidget(self.random_seed_button, 1, 0)
+
+        self.gallery_button = QPushButton("Seed Gallery")
+        self.gallery_button.setToolTip("Browse drafts of many seeds at once and pick one to render")
+        self.gallery_button.clicked.connect(self.show_gallery)
+        random_layout.addWidget(self.gallery_button, 1, 1)
 
         random_layout.addWidget(QLabel("Chaos Factor:"), 2, 0)
         self.chaos_slider = QSlider(Qt.Horizontal)
@@ -381,6 +454,35 @@ class AbstractArtGenerator(QMainWindow):
         random_group.setLayout(random_layout)
         layout.addWidget(random_group)
 
+        # Preview
+        self.progressive_checkbox = QCheckBox("Progressive Preview")
+        self.progressive_checkbox.setChecked(True)
+        layout.addWidget(self.progressive_checkbox)
+
+        self.culling_checkbox = QCheckBox("Skip Hidden Shapes")
+        self.culling_checkbox.setToolTip("Leave out shapes that later opaque shapes cover completely")
+        layout.addWidget(self.culling_checkbox)
+
+        # Export
+        export_group = QGroupBox("Export")
+        export_layout = QGridLayout()
+
+        export_layout.addWidget(QLabel("PNG Compression:"), 0, 0)
+        self.png_compression_spin = QSpinBox()
+        self.png_compression_spin.setRange(0, 9)
+        self.png_compression_spin.setValue(6)
+        self.png_compression_spin.setToolTip("0 saves fastest, 9 makes the smallest files")
+        export_layout.addWidget(self.png_compression_spin, 0, 1)
+
+        export_layout.addWidget(QLabel("JPEG/WebP Quality:"), 1, 0)
+        self.quality_spin = QSpinBox()
+        self.quality_spin.setRange(MIN_QUALITY, MAX_QUALITY)
+        self.quality_spin.setValue(90)
+        export_layout.addWidget(self.quality_spin, 1, 1)
+
+        export_group.setLayout(export_layout)
+        layout.addWidget(export_group)
+
         # Buttons
         button_row = QHBoxLayout()
         self.render_button = QPushButton("Render Art")
@@ -413,6 +515,7 @@ class AbstractArtGenerator(QMainWindow):
             checkbox.setFixedSize(30, 30)
             checkbox.setChecked(True)
             checkbox.stateChanged.connect(self.make_color_toggle(i))
+            checkbox.stateChanged.connect(self.schedule_render)
 
             # Add color label
             color_label = QLabel(f"Color {i + 1}")
@@ -444,602 +547,244 @@ class AbstractArtGenerator(QMainWindow):
         if color.isValid():
             self.colors.append(color.name())
             self.update_color_checkboxes()
+            self.schedule_render()
 
     def clear_custom_colors(self):
         """Clear all custom colors"""
         # Keep the first 6 default colors
         self.colors = self.colors[:6]
         self.update_color_checkboxes()
+        self.schedule_render()
 
     def choose_bg_color(self):
         """Choose a background color"""
         color = QColorDialog.getColor()
         if color.isValid():
+            self.bg_color = color.name()
             self.bg_color_preview.setStyleSheet(f"background-color: {color.name()}; border: 1px solid #ccc;")
+            self.schedule_render()
 
     def set_random_seed(self):
         """Set a random seed value"""
         seed = random.randint(1, 999999)
         self.seed_spin.setValue(seed)
 
-    def generate_harmony_colors(self, base_hue, harmony_type):
-        """Generate a color harmony based on the selected type"""
-        saturation = self.saturation_slider.value() / 100.0
-        value = self.value_slider.value() / 100.0
-
-        base_rgb = colorsys.hsv_to_rgb(base_hue / 360, saturation, value)
-        base_color = QColor.fromRgbF(*base_rgb)
-
-        harmonies = []
-
-        if harmony_type == "Complementary":
-            comp_hue = (base_hue + 180) % 360
-            comp_rgb = colorsys.hsv_to_rgb(comp_hue / 360, saturation, value)
-            harmonies = [base_color, QColor.fromRgbF(*comp_rgb)]
-
-        elif harmony_type == "Analogous":
-            harmonies = [
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(((base_hue - 30) % 360) / 360, saturation, value)),
-                base_color,
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(((base_hue + 30) % 360) / 360, saturation, value))
-            ]
-
-        elif harmony_type == "Triadic":
-            harmonies = [
-                base_color,
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(((base_hue + 120) % 360) / 360, saturation, value)),
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(((base_hue + 240) % 360) / 360, saturation, value))
-            ]
-
-        elif harmony_type == "Tetradic":
-            harmonies = [
-                base_color,
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(((base_hue + 60) % 360) / 360, saturation, value)),
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(((base_hue + 180) % 360) / 360, saturation, value)),
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(((base_hue + 240) % 360) / 360, saturation, value))
-            ]
-
-        elif harmony_type == "Monochromatic":
-            harmonies = [
-                QColor.fromRgbF(
-                    *colorsys.hsv_to_rgb(base_hue / 360, max(0.2, saturation * 0.7), min(1.0, value * 1.2))),
-                base_color,
-                QColor.fromRgbF(*colorsys.hsv_to_rgb(base_hue / 360, min(1.0, saturation * 1.2), max(0.2, value * 0.7)))
-            ]
-
-        else:  # Random
-            harmonies = [self.generate_random_color() for _ in range(4)]
-
-        return harmonies
-
-    def generate_random_color(self):
-        """Generate a random color"""
-        return QColor(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-
-    def create_texture(self, width, height, texture_type, intensity):
-        """Create a texture image"""
-        img = QImage(width, height, QImage.Format_ARGB32)
-        img.fill(Qt.transparent)
-
-        painter = QPainter(img)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setPen(Qt.NoPen)
-
-        # Adjust intensity (0-100 to 0.0-1.0)
-        intensity = intensity / 100.0
-
-        if texture_type == "Noise":
-            for x in range(0, width, 5):
-                for y in range(0, height, 5):
-                    if random.random() < intensity * 0.3:
-                        size = random.randint(1, 4)
-                        alpha = random.randint(30, 100)
-                        color = QColor(0, 0, 0, alpha)
-                        painter.setBrush(color)
-                        painter.drawEllipse(x, y, size, size)
-
-        elif texture_type == "Lines":
-            line_count = int(50 * intensity)
-            for _ in range(line_count):
-                x1 = random.randint(0, width)
-                y1 = random.randint(0, height)
-                x2 = x1 + random.randint(-50, 50)
-                y2 = y1 + random.randint(-50, 50)
-                width_val = random.randint(1, 3)
-                alpha = random.randint(30, 80)
-                color = QColor(0, 0, 0, alpha)
-                pen = QPen(color, width_val)
-                painter.setPen(pen)
-                painter.drawLine(x1, y1, x2, y2)
-
-        elif texture_type == "Dots":
-            dot_count = int(500 * intensity)
-            for _ in range(dot_count):
-                x = random.randint(0, width)
-                y = random.randint(0, height)
-                size = random.randint(1, 4)
-                alpha = random.randint(30, 100)
-                color = QColor(0, 0, 0, alpha)
-                painter.setBrush(color)
-                painter.drawEllipse(x, y, size, size)
-
-        elif texture_type == "Paper":
-            # Create a subtle paper-like texture
-            for x in range(0, width, 3):
-                for y in range(0, height, 3):
-                    if random.random() < intensity * 0.1:
-                        alpha = random.randint(5, 15)
-                        color = QColor(200, 200, 200, alpha)
-                        painter.setBrush(color)
-                        painter.drawRect(x, y, 2, 2)
-
-        painter.end()
-        return img
-
-    def draw_rotated_rect(self, painter):
-        """Draw a rotated rectangle"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-        min_rot = self.min_rot_slider.value()
-        max_rot = self.max_rot_slider.value()
-
-        w = random.randint(min_size, max_size)
-        h = random.randint(min_size, max_size)
-        x = random.randint(0, self.canvas_width - w)
-        y = random.randint(0, self.canvas_height - h)
-        angle = random.randint(min_rot, max_rot)
-
-        painter.save()
-        painter.translate(x + w / 2, y + h / 2)
-        painter.rotate(angle)
-        painter.drawRect(int(-w / 2), int(-h / 2), int(w), int(h))
-        painter.restore()
-
-    def draw_ellipse(self, painter):
-        """Draw an ellipse"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-
-        w = random.randint(min_size, max_size)
-        h = random.randint(min_size, max_size)
-        x = random.randint(0, self.canvas_width - w)
-        y = random.randint(0, self.canvas_height - h)
-        painter.drawEllipse(x, y, w, h)
-
-    def draw_polygon(self, painter):
-        """Draw a polygon"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-        detail = self.detail_slider.value()
-
-        # Create a center point
-        cx = random.randint(50, self.canvas_width - 50)
-        cy = random.randint(50, self.canvas_height - 50)
-
-        points = []
-        for i in range(detail):
-            angle = 2 * math.pi * i / detail
-            radius = random.randint(min_size // 2, max_size // 2)
-            x = cx + radius * math.cos(angle)
-            y = cy + radius * math.sin(angle)
-            points.append(QPointF(x, y))
-
-        polygon = QPolygonF(points)
-        painter.drawPolygon(polygon)
-
-    def draw_spiral(self, painter):
-        """Draw a spiral"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-        detail = self.detail_slider.value()
-
-        center = QPointF(random.randint(100, self.canvas_width - 100),
-                         random.randint(100, self.canvas_height - 100))
-        size = random.randint(min_size // 2, max_size // 2)
-        turns = random.randint(3, 8)
-        path = self.generate_spiral(center, size, turns, detail)
-        painter.drawPath(path)
-
-    def draw_bezier(self, painter):
-        """Draw a Bezier curve"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-
-        start = QPointF(random.randint(0, self.canvas_width), random.randint(0, self.canvas_height))
-        ctrl1 = QPointF(random.randint(0, self.canvas_width), random.randint(0, self.canvas_height))
-        ctrl2 = QPointF(random.randint(0, self.canvas_width), random.randint(0, self.canvas_height))
-        end = QPointF(random.randint(0, self.canvas_width), random.randint(0, self.canvas_height))
-
-        # Create a path with thickness
-        path = QPainterPath()
-        path.moveTo(start)
-        path.cubicTo(ctrl1, ctrl2, end)
-
-        # Draw the curve with thickness
-        pen = painter.pen()
-        pen.setWidth(random.randint(1, 5))
-        painter.setPen(pen)
-        painter.drawPath(path)
-
-    def draw_star(self, painter):
-        """Draw a star"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-        detail = self.detail_slider.value()
-
-        cx = random.randint(50, self.canvas_width - 50)
-        cy = random.randint(50, self.canvas_height - 50)
-        outer_radius = random.randint(min_size // 2, max_size // 2)
-        inner_radius = outer_radius * 0.5
-
-        points = []
-        for i in range(detail * 2):
-            angle = math.pi * i / detail
-            radius = inner_radius if i % 2 == 1 else outer_radius
-            x = cx + radius * math.cos(angle)
-            y = cy + radius * math.sin(angle)
-            points.append(QPointF(x, y))
-
-        polygon = QPolygonF(points)
-        painter.drawPolygon(polygon)
-
-    def draw_arc(self, painter):
-        """Draw an arc"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-
-        w = random.randint(min_size, max_size)
-        h = random.randint(min_size, max_size)
-        x = random.randint(0, self.canvas_width - w)
-        y = random.randint(0, self.canvas_height - h)
-        start_angle = random.randint(0, 360) * 16
-        span_angle = random.randint(45, 270) * 16
-
-        painter.drawArc(x, y, w, h, start_angle, span_angle)
-
-    def draw_donut(self, painter):
-        """Draw a donut shape"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-
-        cx = random.randint(50, self.canvas_width - 50)
-        cy = random.randint(50, self.canvas_height - 50)
-        outer_radius = random.randint(min_size // 2, max_size // 2)
-        inner_radius = outer_radius * random.uniform(0.3, 0.7)
-
-        path = QPainterPath()
-        path.addEllipse(cx, cy, outer_radius, outer_radius)
-        inner_path = QPainterPath()
-        inner_path.addEllipse(cx + (outer_radius - inner_radius) / 2,
-                              cy + (outer_radius - inner_radius) / 2,
-                              inner_radius, inner_radius)
-        path = path.subtracted(inner_path)
-        painter.drawPath(path)
-
-    def draw_cross(self, painter):
-        """Draw a cross"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-
-        cx = random.randint(50, self.canvas_width - 50)
-        cy = random.randint(50, self.canvas_height - 50)
-        size = random.randint(min_size, max_size)
-        thickness = random.randint(5, size // 3)
-
-        # Horizontal bar
-        painter.drawRect(cx - size // 2, cy - thickness // 2, size, thickness)
-        # Vertical bar
-        painter.drawRect(cx - thickness // 2, cy - size // 2, thickness, size)
-
-    def draw_line(self, painter):
-        """Draw a line"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-
-        x1 = random.randint(0, self.canvas_width)
-        y1 = random.randint(0, self.canvas_height)
-        length = random.randint(min_size, max_size)
-        angle = random.uniform(0, 2 * math.pi)
-
-        x2 = x1 + length * math.cos(angle)
-        y2 = y1 + length * math.sin(angle)
-
-        # Set pen width
-        pen = painter.pen()
-        pen.setWidth(random.randint(1, 5))
-        painter.setPen(pen)
-
-        painter.drawLine(x1, y1, x2, y2)
-
-    def draw_text(self, painter):
-        """Draw text as a shape"""
-        min_size = self.min_size_slider.value()
-        max_size = self.max_size_slider.value()
-
-        x = random.randint(50, self.canvas_width - 50)
-        y = random.randint(50, self.canvas_height - 50)
-        size = random.randint(min_size, max_size)
-
-        # Choose text content
-        text_choice = self.text_content.currentText()
-        if text_choice == "Random":
-            text_options = ["A", "B", "C", "1", "2", "3", "!", "@", "#", "&", "*", "X", "Y", "Z"]
-            text = random.choice(text_options)
-        else:
-            text = text_choice
-
-        font = QFont("Arial", size)
-        painter.setFont(font)
-        painter.drawText(x, y, text)
-
-    def generate_spiral(self, center, size, turns, detail):
-        """Generate a spiral path"""
-        path = QPainterPath()
-        angle = 0
-        max_angle = turns * 360
-        step = 5
-
-        path.moveTo(center)
-        for i in range(0, max_angle, step):
-            r = size * (1 + i / max_angle)
-            rad_angle = math.radians(i)
-            x = center.x() + r * math.cos(rad_angle)
-            y = center.y() + r * math.sin(rad_angle)
-            path.lineTo(QPointF(x, y))
-
-        return path
-
-    def random_gradient(self, base_color, width, height):
-        """Create a random gradient"""
-        gradient_type = self.gradient_combo.currentText()
-        if gradient_type == "Random":
-            gradient_type = random.choice(["Linear", "Radial", "Conical"])
-
-        if gradient_type == "Linear":
-            grad = QLinearGradient(
-                random.randint(0, width),
-                random.randint(0, height),
-                random.randint(0, width),
-                random.randint(0, height)
-            )
-        elif gradient_type == "Radial":
-            cx = random.randint(0, width)
-            cy = random.randint(0, height)
-            radius = random.randint(50, min(width, height) // 2)
-            grad = QRadialGradient(cx, cy, radius)
-        else:  # Conical
-            cx = random.randint(0, width)
-            cy = random.randint(0, height)
-            angle = random.randint(0, 360)
-            grad = QConicalGradient(cx, cy, angle)
-
-        # Add color stops
-        stops = self.gradient_complexity.value() + 1
-        for i in range(stops):
-            pos = i / (stops - 1) if stops > 1 else 0.5
-            # Create a variation of the base color
-            h, s, v, a = base_color.getHsvF()
-            h = (h + random.uniform(-0.1, 0.1)) % 1.0
-            s = min(1.0, max(0.0, s + random.uniform(-0.2, 0.2)))
-            v = min(1.0, max(0.0, v + random.uniform(-0.2, 0.2)))
-            color = QColor.fromHsvF(h, s, v, a)
-            grad.setColorAt(pos, color)
-
-        return grad
-
-    def get_stroke_color(self, base_color):
-        """Get a stroke color based on the selected option"""
-        stroke_type = self.stroke_color_combo.currentText()
-
-        if stroke_type == "Contrast":
-            # Return black or white based on color brightness
-            brightness = base_color.red() * 0.299 + base_color.green() * 0.587 + base_color.blue() * 0.114
-            return QColor(Qt.black) if brightness > 128 else QColor(Qt.white)
-
-        elif stroke_type == "Complementary":
-            # Get complementary color
-            h, s, v, a = base_color.getHsvF()
-            comp_h = (h + 0.5) % 1.0
-            return QColor.fromHsvF(comp_h, s, v)
-
-        elif stroke_type == "Random":
-            return self.generate_random_color()
-
-        elif stroke_type == "Black":
-            return QColor(Qt.black)
-
-        else:  # White
-            return QColor(Qt.white)
-
-    def apply_symmetry(self, painter, shape_func):
-        """Apply symmetry to a shape"""
-        symmetry_type = self.symmetry_combo.currentText()
-
-        if symmetry_type == "None":
-            shape_func(painter)
+    def show_gallery(self):
+        """Open the seed gallery on the page holding the current seed"""
+        if self.gallery is None:
+            # Created on first use, so its spin box does not trigger renders of the main canvas
+            self.gallery = SeedGallery(self.current_settings, self)
+            self.gallery.seed_chosen.connect(self.choose_seed)
+        self.gallery.show()
+        self.gallery.raise_()
+        seed = self.seed_spin.value()
+        self.gallery.show_page(seed - (seed - 1) % GALLERY_SEEDS)
+
+    def choose_seed(self, seed):
+        """Render a seed picked in the gallery, reusing the scene the gallery generated for it"""
+        self.renderer.adopt_scene(self.gallery.renderer, self.current_settings().replace(seed=seed))
+        self.seed_spin.setValue(seed)
+        self.render_art()
+
+    def current_settings(self):
+        """Snapshot the current widget values into an immutable RenderSettings"""
+        return RenderSettings(
+            width=self.canvas_width,
+            height=self.canvas_height,
+            seed=self.seed_spin.value(),
+            colors=tuple(self.colors),
+            selected_colors=tuple(self.selected_colors),
+            hue=self.hue_slider.value(),
+            harmony=self.harmony_combo.currentText(),
+            saturation=self.saturation_slider.value(),
+            value=self.value_slider.value(),
+            bg_type=self.bg_combo.currentText(),
+            bg_color=self.bg_color,
+            shapes=tuple(s for s in self.shapes if self.shape_checkboxes[s].isChecked()),
+            min_size=self.min_size_slider.value(),
+            max_size=self.max_size_slider.value(),
+            min_rotation=self.min_rot_slider.value(),
+            max_rotation=self.max_rot_slider.value(),
+            detail=self.detail_slider.value(),
+            text_content=self.text_content.currentText(),
+            symmetry=self.symmetry_combo.currentText(),
+            radial_sections=self.radial_sections.value(),
+            alpha_enabled=self.alpha_checkbox.isChecked(),
+            min_alpha=self.min_alpha_slider.value(),
+            max_alpha=self.max_alpha_slider.value(),
+            gradient_enabled=self.gradient_checkbox.isChecked(),
+            gradient_type=self.gradient_combo.currentText(),
+            gradient_complexity=self.gradient_complexity.value(),
+            stroke_enabled=self.stroke_checkbox.isChecked(),
+            stroke_width=self.stroke_width.value(),
+            stroke_color=self.stroke_color_combo.currentText(),
+            texture_enabled=self.texture_checkbox.isChecked(),
+            texture_type=self.texture_combo.currentText(),
+            texture_intensity=self.texture_intensity.value(),
+            complexity=self.complexity_slider.value(),
+            density=self.density_slider.value(),
+            chaos=self.chaos_slider.value(),
+            dense_enabled=self.dense_checkbox.isChecked(),
+            dense_count=self.dense_count_spin.value(),
+            dense_kind=self.dense_kind_combo.currentText(),
+            dense_size=self.dense_size_spin.value(),
+        )
+
+    def connect_auto_render(self):
+        """Schedule a debounced render whenever a parameter widget changes"""
+        for slider in self.findChildren(QSlider):
+            slider.valueChanged.connect(self.schedule_render)
+        for spin in self.findChildren(QSpinBox):
+            # Export options only matter when saving
+            if spin not in (self.png_compression_spin, self.quality_spin):
+                spin.valueChanged.connect(self.schedule_render)
+        for combo in self.findChildren(QComboBox):
+            combo.currentIndexChanged.connect(self.schedule_render)
+        for checkbox in [self.alpha_checkbox, self.gradient_checkbox, self.stroke_checkbox,
+                         self.texture_checkbox, self.dense_checkbox] + list(self.shape_checkboxes.values()):
+            checkbox.toggled.connect(self.schedule_render)
+
+    def schedule_render(self, *args):
+        """Restart the debounce timer; the render starts once changes settle"""
+        self.render_timer.start()
+
+    def is_stale(self, job_id):
+        """Whether a render job has been superseded by a newer request"""
+        return job_id != self.render_generation
+
+    def render_art(self):
+        """Render the abstract art based on current settings"""
+        self.render_timer.stop()
+        try:
+            settings = self.current_settings()
+        except Exception as e:
+            self.status_bar.showMessage(f"Error: {str(e)}")
             return
 
-        # Save the original transformation
-        painter.save()
+        self.render_generation += 1
+        self.random_seed = settings.seed
+        self.renderer.occlusion_culling = self.culling_checkbox.isChecked()
+        self.status_bar.showMessage(f"Rendering {settings.num_primitives} shapes with seed {settings.seed}...")
+        self.render_pool.start(RenderJob(self.render_generation, self.renderer, settings,
+                                         self.is_stale, self.render_signals,
+                                         progressive=self.progressive_checkbox.isChecked()))
+
+    def on_render_preview(self, job_id, image):
+        """Show the low resolution draft until the full render arrives"""
+        if self.is_stale(job_id):
+            return
+        pixmap = QPixmap.fromImage(image).scaled(self.canvas_width, self.canvas_height,
+                                                 Qt.IgnoreAspectRatio, Qt.FastTransformation)
+        self.canvas.setPixmap(pixmap)
 
-        if symmetry_type == "Horizontal":
-            # Draw original
-            shape_func(painter)
+    def on_render_finished(self, job_id, image, settings, render_stats):
+        """Show a finished render unless a newer one was requested meanwhile"""
+        if self.is_stale(job_id):
+            return
+        start = time.perf_counter()
+        pixmap = QPixmap.fromImage(image)
+
+        # Update canvas
+        self.canvas.setPixmap(pixmap)
+        upload_ms = (time.perf_counter() - start) * 1000
+        self.last_image = image
+        stats = self.render_cache.stats()
+        culled = ""
+        if "culled" in render_stats:
+            culled = f", {render_stats['culled']} hidden skipped"
+        profile = render_stats["profile"]
+        self.status_bar.showMessage(
+            f"Rendered {settings.num_primitives} shapes with seed {settings.seed}{culled} "
+            f"in {summarize(profile, limit=3)}, upload {upload_ms:.0f}ms "
+            f"(cache: {stats['hits'] + stats['disk_hits']} hits, {stats['misses']} misses)")
+        # The full breakdown shows when hovering over the status bar
+        self.status_bar.setToolTip("\n".join(
+            [f"{name}: {stage['ms']:.1f}ms x{stage['count']}" for name, stage in profile["stages"].items()]
+            + [f"upload: {upload_ms:.1f}ms"]))
+
+    def on_render_failed(self, job_id, message):
+        if not self.is_stale(job_id):
+            self.status_bar.showMessage(f"Error: {message}")
+
+    def closeEvent(self, event):
+        """Cancel any running render before the window goes away"""
+        self.render_generation += 1
+        self.render_pool.waitForDone()
+        if self.gallery is not None:
+            self.gallery.close()
+            self.gallery.pool.waitForDone()
+        # Let saves that are still encoding finish writing their files
+        self.export_pool.waitForDone()
+        # Keep this session's renders on disk for next time
+        self.render_cache.flush()
+        super().closeEvent(event)
 
-            # Draw reflection
-            painter.translate(self.canvas_width, 0)
-            painter.scale(-1, 1)
-            shape_func(painter)
+    def save_image(self):
+        """Save the generated image to a file, encoding it in the background"""
+        if self.last_image is None:
+            self.status_bar.showMessage("No image to save")
+            return
 
-        elif symmetry_type == "Vertical":
-            # Draw original
-            shape_func(painter)
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Save Art", "",
+            "PNG Images (*.png);;JPEG Images (*.jpg *.jpeg);;WebP Images (*.webp);;"
+            "PPM Images (*.ppm);;Raw RGBA (*.raw *.rgba);;All Files (*)"
+        )
+        if not file_path:
+            return
 
-            # Draw reflection
-            painter.translate(0, self.canvas_height)
-            painter.scale(1, -1)
-            shape_func(painter)
+        try:
+            export_format(file_path)
+        except ValueError:
+            # No known extension: take it from the chosen filter, defaulting to PNG
+            extension = {"JPEG": ".jpg", "WebP": ".webp", "PPM": ".ppm", "Raw": ".raw"}.get(
+                selected_filter.split(" ")[0], ".png")
+            file_path += extension
 
-        elif symmetry_type == "Radial":
-            sections = self.radial_sections.value()
-            angle_step = 360 / sections
+        options = ExportOptions(png_compression=self.png_compression_spin.value(),
+                                quality=self.quality_spin.value())
+        self.status_bar.showMessage(f"Saving {file_path}...")
+        self.export_pool.start(ExportJob(self.last_image, file_path, options, self.export_signals))
 
-            for i in range(sections):
-                # Save state for each section
-                painter.save()
+    def on_export_progress(self, path, done, total):
+        self.status_bar.showMessage(f"Saving {path}... {100 * done // max(total, 1)}%")
 
-                # Move to center and rotate
-                painter.translate(self.canvas_width / 2, self.canvas_height / 2)
-                painter.rotate(i * angle_step)
-                painter.translate(-self.canvas_width / 2, -self.canvas_height / 2)
+    def on_export_finished(self, path):
+        self.status_bar.showMessage(f"Image saved to {path}")
 
-                # Draw the shape
-                shape_func(painter)
+    def on_export_failed(self, path, message):
+        self.status_bar.showMessage(f"Could not save {path}: {message}")
 
-                # Restore to original state
-                painter.restore()
 
-        # Restore original transformation
-        painter.restore()
+def run_command(argv):
+    """Run a headless command line subcommand"""
+    parser = argparse.ArgumentParser(prog="abstracter.py")
+    subparsers = parser.add_subparsers(dest="command", required=True)
 
-    def render_art(self):
-        """Render the abstract art based on current settings"""
-        try:
-            # Set random seed for reproducibility
-            self.random_seed = self.seed_spin.value()
-            random.seed(self.random_seed)
-
-            # Create pixmap and painter
-            pixmap = QPixmap(self.canvas_width, self.canvas_height)
-
-            # Set background
-            bg_type = self.bg_combo.currentText()
-            if bg_type == "Random":
-                bg_color = self.generate_random_color()
-                pixmap.fill(bg_color)
-            elif bg_type == "Solid":
-                bg_color = QColor(self.bg_color_preview.palette().window().color())
-                pixmap.fill(bg_color)
-            elif bg_type == "Gradient":
-                # Create a random gradient background
-                painter = QPainter(pixmap)
-                gradient = self.random_gradient(self.generate_random_color(),
-                                                self.canvas_width, self.canvas_height)
-                painter.fillRect(0, 0, self.canvas_width, self.canvas_height, gradient)
-                painter.end()
-            else:  # Pattern
-                pixmap.fill(Qt.white)
-                painter = QPainter(pixmap)
-                for _ in range(100):
-                    color = self.generate_random_color()
-                    color.setAlpha(50)
-                    painter.setBrush(color)
-                    size = random.randint(10, 100)
-                    x = random.randint(0, self.canvas_width)
-                    y = random.randint(0, self.canvas_height)
-                    painter.drawEllipse(x, y, size, size)
-                painter.end()
-
-            painter = QPainter(pixmap)
-            painter.setRenderHint(QPainter.Antialiasing)
-
-            # Get selected colors or generate harmony
-            selected_colors = [QColor(color) for i, color in enumerate(self.colors)
-                               if i in self.selected_colors or not self.selected_colors]
-
-            if not selected_colors:
-                base_hue = self.hue_slider.value()
-                harmony_type = self.harmony_combo.currentText()
-                selected_colors = self.generate_harmony_colors(base_hue, harmony_type)
-
-            # Get enabled shapes
-            enabled_shapes = [s for s in self.shapes if self.shape_checkboxes[s].isChecked()]
-
-            # Get number of shapes based on complexity and density
-            complexity = self.complexity_slider.value()
-            density = self.density_slider.value() / 100.0
-            num_shapes = int(complexity * density)
-
-            # Set stroke if enabled
-            if self.stroke_checkbox.isChecked():
-                pen_width = self.stroke_width.value()
-                painter.setPen(QPen(Qt.black, pen_width))
-            else:
-                painter.setPen(Qt.NoPen)
-
-            # Draw shapes
-            for _ in range(num_shapes):
-                color = random.choice(selected_colors)
-
-                # Set transparency
-                if self.alpha_checkbox.isChecked():
-                    min_alpha = self.min_alpha_slider.value()
-                    max_alpha = self.max_alpha_slider.value()
-                    alpha = random.randint(min_alpha, max_alpha)
-                    color.setAlpha(alpha)
-                else:
-                    color.setAlpha(255)
-
-                # Set fill style (solid or gradient)
-                if self.gradient_checkbox.isChecked():
-                    brush = QBrush(self.random_gradient(color, self.canvas_width, self.canvas_height))
-                else:
-                    brush = QBrush(color)
-
-                painter.setBrush(brush)
-
-                # Set stroke color if enabled
-                if self.stroke_checkbox.isChecked():
-                    stroke_color = self.get_stroke_color(color)
-                    painter.setPen(QPen(stroke_color, self.stroke_width.value()))
-
-                # Choose shape function
-                shape_type = random.choice(enabled_shapes)
-                shape_func = getattr(self, f"draw_{shape_type}")
-
-                # Apply symmetry
-                self.apply_symmetry(painter, shape_func)
-
-            # Add texture if enabled
-            if self.texture_checkbox.isChecked():
-                texture_type = self.texture_combo.currentText()
-                intensity = self.texture_intensity.value()
-                texture = self.create_texture(self.canvas_width, self.canvas_height,
-                                              texture_type, intensity)
-                painter.drawImage(0, 0, texture)
-
-            painter.end()
-
-            # Update canvas
-            self.canvas.setPixmap(pixmap)
-            self.last_pixmap = pixmap
-            self.status_bar.showMessage(f"Rendered {num_shapes} shapes with seed {self.random_seed}")
+    batch_parser = subparsers.add_parser("batch", help="Render a range of seeds to files")
+    batch.add_batch_arguments(batch_parser)
+    batch_parser.set_defaults(func=batch.main)
 
-        except Exception as e:
-            self.status_bar.showMessage(f"Error: {str(e)}")
+    tiled_parser = subparsers.add_parser("tiled", help="Render one very large image tile by tile")
+    tiling.add_tiled_arguments(tiled_parser)
+    tiled_parser.set_defaults(func=tiling.main)
 
-    def save_image(self):
-        """Save the generated image to a file"""
-        if not self.last_pixmap:
-            self.status_bar.showMessage("No image to save")
-            return
+    animate_parser = subparsers.add_parser("animate", help="Render a frame sequence with interpolated settings")
+    animation.add_animate_arguments(animate_parser)
+    animate_parser.set_defaults(func=animation.main)
 
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "Save Art", "",
-            "PNG Images (*.png);;JPEG Images (*.jpg *.jpeg);;All Files (*)"
-        )
+    serve_parser = subparsers.add_parser("serve", help="Serve renders as PNG over HTTP")
+    server.add_serve_arguments(serve_parser)
+    serve_parser.set_defaults(func=server.main)
 
-        if file_path:
-            if file_path.endswith(('.png', '.jpg', '.jpeg')):
-                self.last_pixmap.save(file_path)
-                self.status_bar.showMessage(f"Image saved to {file_path}")
-            else:
-                # Default to PNG if no extension
-                self.last_pixmap.save(file_path + ".png")
-                self.status_bar.showMessage(f"Image saved to {file_path}.png")
+    args = parser.parse_args(argv)
+    return args.func(args)
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(run_command(sys.argv[1:]))
+
     app = QApplication(sys.argv)
     app.setStyle("Fusion")  # Modern style
 
@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+
+import numpy as np
+
+from settings import RenderSettings, HARMONY_FIELDS, UNUSED_FIELDS
+from backends import BACKENDS, create_renderer
+from export import rgba_bytes
+
+
+# Per-process renderer set up by init_worker; its layer cache carries unchanged layers from frame to frame
+_renderer = None
+
+
+class Keyframes:
+    """Values of one numeric settings field at some frames, linearly interpolated in between"""
+
+    def __init__(self, field, points):
+        if not points:
+            raise ValueError(f"No keyframes for {field}")
+        self.field = field
+        self.points = sorted(points)
+
+    def value(self, frame):
+        frames = [f for f, _ in self.points]
+        values = [v for _, v in self.points]
+        return float(np.interp(frame, frames, values))
+
+
+def numeric_fields():
+    """Settings fields that can be animated, by name and type"""
+    return {f.name: f.type for f in fields(RenderSettings)
+            if f.type in (int, float) and f.name not in UNUSED_FIELDS}
+
+
+def parse_keyframes(spec, frames):
+    """Parse "max_size=40..200" (first to last frame) or "min_alpha=0:50,300:255,599:50" (frame:value pairs)"""
+    field, _, values = spec.partition("=")
+    field = field.strip()
+    if field in UNUSED_FIELDS:
+        raise ValueError(f"Cannot animate {field!r}, which does not affect the render")
+    if field not in numeric_fields():
+        raise ValueError(f"Cannot animate {field!r}; numeric settings are: {', '.join(numeric_fields())}")
+    if ".." in values:
+        start, end = values.split("..", 1)
+        return Keyframes(field, [(0, float(start)), (max(frames - 1, 0), float(end))])
+
+    points = []
+    for part in values.split(","):
+        frame, _, value = part.partition(":")
+        if not value:
+            raise ValueError(f"Invalid keyframe {part!r} for {field}, expected frame:value")
+        points.append((int(frame), float(value)))
+    return Keyframes(field, points)
+
+
+def unseen_keyframes(settings, keyframes):
+    """Animated fields that do not change the frames of settings, as its palette colors are picked"""
+    if not settings.picked_colors():
+        return []
+    return [track.field for track in keyframes if track.field in HARMONY_FIELDS]
+
+
+def frame_settings(settings, keyframes, frame):
+    """Settings of one frame, with every animated field at its interpolated value"""
+    types = numeric_fields()
+    changes = {}
+    for track in keyframes:
+        value = track.value(frame)
+        changes[track.field] = int(round(value)) if types[track.field] is int else value
+    return settings.replace(**changes)
+
+
+def init_worker(backend="qt"):
+    """Create the one offscreen renderer this worker process reuses for all its frames"""
+    global _renderer
+    _renderer = create_renderer(backend)
+
+
+def render_frames(frames):
+    """Render a run of consecutive frame settings in the worker, returning their RGBA bytes"""
+    return [rgba_bytes(_renderer.render(settings)) for settings in frames]
+
+
+class FrameOutput:
+    """Writes frames in order to a pipe (path "-") or to numbered files such as frames/frame_%05d.rgba"""
+
+    def __init__(self, path):
+        self.path = path
+        if path == "-":
+            self.stream = sys.stdout.buffer
+        else:
+            self.stream = None
+            if "%" not in path:
+                path = os.path.join(path, "frame_%05d.rgba")
+            self.pattern = path
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def write(self, index, data):
+        if self.stream is not None:
+            self.stream.write(data)
+            self.stream.flush()
+            return
+        with open(self.pattern % index, "wb") as f:
+            f.write(data)
+
+
+def run_animation(settings, keyframes, frames, out, workers=None, chunk_size=4, backend="qt", log=sys.stderr):
+    """Render frames on a process pool and write them to out in order; returns the frames written
+
+    Each job is a run of consecutive frames, so layers the animated fields do
+    not touch, such as the background, are painted once per job and reused.
+    Only a few jobs are kept ahead of the writer, bounding the frames held in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    output = FrameOutput(out)
+    chunk_size = max(1, chunk_size)
+    starts = iter(range(0, frames, chunk_size))
+
+    def frame_run(start):
+        return [frame_settings(settings, keyframes, frame) for frame in range(start, min(start + chunk_size, frames))]
+
+    done = 0
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(backend,)) as executor:
+        pending = deque()
+        for start in starts:
+            pending.append(executor.submit(render_frames, frame_run(start)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            for data in pending.popleft().result():
+                output.write(done, data)
+                done += 1
+            start = next(starts, None)
+            if start is not None:
+                pending.append(executor.submit(render_frames, frame_run(start)))
+            if log:
+                elapsed = time.perf_counter() - start_time
+                log.write(f"\rRendered {done}/{frames} frames ({done / elapsed:.1f}/s)")
+                log.flush()
+    if log:
+        log.write("\n")
+    return done
+
+
+def add_animate_arguments(parser):
+    """Register the animate command line options on an argparse parser"""
+    parser.add_argument("--frames", type=int, required=True, help="Number of frames")
+    parser.add_argument("--key", action="append", default=[], metavar="FIELD=VALUES",
+                        help='Animated setting, e.g. "max_size=40..200" or "min_alpha=0:50,300:255,599:50"; repeatable')
+    parser.add_argument("--out", required=True,
+                        help='"-" to stream raw RGBA frames to stdout (e.g. into ffmpeg -f rawvideo -pix_fmt rgba), '
+                             'a directory, or a numbered file pattern such as frames/frame_%%05d.rgba')
+    parser.add_argument("--settings", default=None, help="JSON file with render settings")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=4, help="Consecutive frames sent to a worker per job")
+    parser.add_argument("--backend", default="qt", choices=BACKENDS,
+                        help="Rasterizer: qt, or numpy for machines without PyQt5")
+
+
+def main(args):
+    """Run the animate command from parsed arguments"""
+    settings = RenderSettings.load(args.settings) if args.settings else RenderSettings()
+    keyframes = [parse_keyframes(spec, args.frames) for spec in args.key]
+    unseen = unseen_keyframes(settings, keyframes)
+    if unseen:
+        sys.stderr.write(f"Warning: animating {', '.join(unseen)} will not change the frames, as the harmony "
+                         f"palette is only used when no palette color is picked; clear colors in the settings\n")
+    run_animation(settings, keyframes, args.frames, args.out, workers=args.workers,
+                  chunk_size=args.chunk_size, backend=args.backend)
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog="animation.py", description="Render an animated frame sequence")
+    add_animate_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,13 @@
+# Renderers that share the render(settings, cancelled=None) API; the result has save(path)
+BACKENDS = ("qt", "numpy")
+
+
+def create_renderer(backend="qt", **kwargs):
+    """Build a renderer for a backend name, importing Qt only when it is asked for"""
+    if backend == "qt":
+        from renderer import ArtRenderer
+        return ArtRenderer(**kwargs)
+    elif backend == "numpy":
+        from raster import NumpyRenderer
+        return NumpyRenderer(**kwargs)
+    raise ValueError(f"Unknown backend: {backend}")
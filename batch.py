@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from settings import RenderSettings
+from backends import BACKENDS, create_renderer
+from export import EXPORT_FORMATS, ExportOptions, Exporter, add_export_arguments, export_options
+
+
+# Per-process state set up by init_worker
+_renderer = None
+_settings = None
+_options = None
+
+
+def parse_seeds(text):
+    """Parse a seed spec such as "1-100,200,300-310" into a list of seeds"""
+    seeds = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            start, end = int(start), int(end)
+            if end < start:
+                raise ValueError(f"Invalid seed range: {part}")
+            seeds.extend(range(start, end + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+
+def output_path(out_dir, seed, fmt):
+    """File name used for a seed inside the output directory"""
+    return os.path.join(out_dir, f"art_{seed:06d}.{fmt}")
+
+
+def init_worker(settings, cache_dir=None, backend="qt", options=ExportOptions()):
+    """Create the one offscreen renderer this worker process reuses for every job"""
+    global _renderer, _settings, _options
+    renderer_options = {}
+    if cache_dir:
+        from cache import RenderCache
+        # Batch renders rarely repeat within a run, so results go straight to the disk tier
+        renderer_options["result_cache"] = RenderCache(memory_budget=0, disk_dir=cache_dir)
+    _renderer = create_renderer(backend, **renderer_options)
+    _settings = settings
+    _options = options
+
+
+def render_seeds(seeds, out_dir, fmt, profile=False):
+    """Render a chunk of seeds in the worker, encoding each file on a thread while the next seed renders
+
+    Returns the written paths, how many of them came from the render cache and,
+    with profile, a per-stage time report of every seed.
+    """
+    cache = getattr(_renderer, "result_cache", None)
+    hits_before = cache.stats()["disk_hits"] if cache else 0
+    futures = []
+    reports = []
+    with Exporter(options=_options) as exporter:
+        for seed in seeds:
+            stats = {} if profile else None
+            image = _renderer.render(_settings.replace(seed=seed), stats=stats)
+            futures.append(exporter.submit(image, output_path(out_dir, seed, fmt), fmt))
+            if profile:
+                reports.append({"seed": seed, **stats["profile"]})
+    written = [future.result() for future in futures]
+    hits = cache.stats()["disk_hits"] - hits_before if cache else 0
+    return written, hits, reports
+
+
+def chunked(items, size):
+    """Split a list into lists of at most size items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_batch(settings, seeds, out_dir, workers=None, fmt="png", chunk_size=16, log=sys.stdout,
+              cache_dir=None, backend="qt", options=ExportOptions(), profile_path=None):
+    """Render every seed on a process pool and return the number of files written
+
+    With cache_dir, renders already in that render cache are not painted again.
+    With profile_path, a JSON line per seed with its render stage times is written there.
+    """
+    if cache_dir and backend != "qt":
+        raise ValueError("The render cache needs the qt backend")
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(seeds, max(1, chunk_size))
+
+    done = 0
+    cached = 0
+    start = time.perf_counter()
+    profile_file = open(profile_path, "w") if profile_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(settings, cache_dir, backend, options)) as executor:
+            futures = [executor.submit(render_seeds, chunk, out_dir, fmt, profile_file is not None)
+                       for chunk in chunks]
+            for future in as_completed(futures):
+                written, hits, reports = future.result()
+                done += len(written)
+                cached += hits
+                for report in reports:
+                    profile_file.write(json.dumps(report) + "\n")
+                if log:
+                    elapsed = time.perf_counter() - start
+                    log.write(f"\rRendered {done}/{len(seeds)} images ({done / elapsed:.1f}/s, {cached} from cache)")
+                    log.flush()
+    finally:
+        if profile_file:
+            profile_file.close()
+    if log:
+        log.write("\n")
+    return done
+
+
+def add_batch_arguments(parser):
+    """Register the batch command line options on an argparse parser"""
+    parser.add_argument("--seeds", required=True, help='Seeds to render, e.g. "1-100000" or "1,5,9-12"')
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--settings", default=None, help="JSON file with render settings")
+    parser.add_argument("--format", default="png", choices=EXPORT_FORMATS,
+                        help="Output image format (the numpy backend writes png, ppm or raw RGBA)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Seeds sent to a worker per job")
+    parser.add_argument("--cache-dir", default=None, help="Render cache directory shared between runs")
+    parser.add_argument("--backend", default="qt", choices=BACKENDS,
+                        help="Rasterizer: qt, or numpy for machines without PyQt5")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help="Write the render stage times of every seed to FILE as JSON lines")
+    add_export_arguments(parser)
+
+
+def main(args):
+    """Run the batch command from parsed arguments"""
+    settings = RenderSettings.load(args.settings) if args.settings else RenderSettings()
+    seeds = parse_seeds(args.seeds)
+    run_batch(settings, seeds, args.out, workers=args.workers, fmt=args.format,
+              chunk_size=args.chunk_size, cache_dir=args.cache_dir, backend=args.backend,
+              options=export_options(args), profile_path=args.profile)
+    return 0
+
+
+if __name__ == "__main__":
+    # Runs without importing the GUI, so the numpy backend works where PyQt5 is not installed
+    import argparse
+    parser = argparse.ArgumentParser(prog="batch.py", description="Render a range of seeds to files")
+    add_batch_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,51 @@
+"""Time the high-count mode from 1M to 5M primitives, to show it grows linearly with the count.
+
+Usage: python benchmarks/dense_benchmark.py [--width 3840] [--height 2160] [--kind Dots] [--repeat N]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import RenderSettings, DENSE_KINDS  # noqa: E402
+from scene import SceneGenerator  # noqa: E402
+from dense import splat  # noqa: E402
+
+
+COUNTS = (1000000, 2000000, 3000000, 4000000, 5000000)
+
+
+def best_time(func, repeat):
+    """Best wall time of repeat calls"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--kind", default="Dots", choices=DENSE_KINDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'primitives':>10} {'generate':>10} {'splat':>10} {'total':>10} {'per 1M':>10}")
+    for count in COUNTS:
+        settings = RenderSettings(width=args.width, height=args.height, dense_enabled=True,
+                                  dense_count=count, dense_kind=args.kind)
+        generate_time, layer = best_time(lambda: SceneGenerator(settings).generate_dense(), args.repeat)
+        splat_time, _ = best_time(lambda: splat(layer, args.width, args.height), args.repeat)
+        total = generate_time + splat_time
+        print(f"{count:>10} {generate_time * 1000:>8.0f}ms {splat_time * 1000:>8.0f}ms {total * 1000:>8.0f}ms "
+              f"{total * 1000 / (count / 1000000):>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
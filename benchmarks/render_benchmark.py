@@ -0,0 +1,136 @@
+"""Time full renders across shape types, effects, symmetry modes and resolutions.
+
+Usage: python benchmarks/render_benchmark.py [--out results.json] [--compare baseline.json]
+       [--filter TEXT] [--repeat N] [--threshold 0.1]
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QT_VERSION_STR  # noqa: E402
+
+from settings import RenderSettings, SHAPES  # noqa: E402
+from renderer import ArtRenderer  # noqa: E402
+import texture  # noqa: E402
+
+
+SYMMETRY_MODES = ("None", "Horizontal", "Vertical", "Radial")
+
+# Same range as the Number of Shapes slider, at full density
+COMPLEXITY_LEVELS = (10, 50, 150, 300, 500)
+
+RESOLUTIONS = ((800, 600), (1920, 1080), (3840, 2160), (7680, 4320))
+
+
+def benchmark_cases():
+    """(name, settings changes) of every case, all starting from the default settings"""
+    cases = [("mix", {})]
+    for shape in SHAPES:
+        cases.append((f"shape/{shape}", {"shapes": (shape,)}))
+    for complexity in COMPLEXITY_LEVELS:
+        cases.append((f"complexity/{complexity}", {"complexity": complexity, "density": 100}))
+    for gradient in (False, True):
+        for stroke in (False, True):
+            cases.append((f"effects/gradient={int(gradient)},stroke={int(stroke)}",
+                          {"gradient_enabled": gradient, "stroke_enabled": stroke}))
+    for texture_type in texture.TEXTURE_TYPES:
+        cases.append((f"texture/{texture_type}", {"texture_enabled": True, "texture_type": texture_type}))
+    for symmetry in SYMMETRY_MODES:
+        cases.append((f"symmetry/{symmetry}", {"symmetry": symmetry}))
+    for width, height in RESOLUTIONS:
+        cases.append((f"resolution/{width}x{height}", {"width": width, "height": height}))
+    return cases
+
+
+def time_render(settings, repeat):
+    """Wall times of repeat cold renders, each rebuilding every layer like a fresh render_art"""
+    renderer = ArtRenderer()
+    # The first render warms up fonts and glyph caches, which no later render pays for
+    renderer.render(settings)
+    times = []
+    for _ in range(repeat):
+        renderer.layer_cache.clear()
+        start = time.perf_counter()
+        renderer.render(settings)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_cases(cases, repeat, log=sys.stdout):
+    """Time every case and return the results keyed by case name"""
+    results = {}
+    for name, changes in cases:
+        settings = RenderSettings(**changes)
+        times = time_render(settings, repeat)
+        results[name] = {
+            "best": min(times),
+            "median": statistics.median(times),
+            "shapes": settings.num_shapes,
+            "size": [settings.width, settings.height],
+        }
+        log.write(f"{name:<40} {min(times) * 1000:>9.1f}ms {statistics.median(times) * 1000:>9.1f}ms\n")
+        log.flush()
+    return results
+
+
+def environment():
+    """Where the numbers were measured, so baselines from other machines stand out"""
+    return {
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Cases whose best time grew by more than threshold over the baseline, as (name, old, new)"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is not None and result["best"] > old["best"] * (1 + threshold):
+            regressions.append((name, old["best"], result["best"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--filter", default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--out", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON file from an earlier --out")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown of the best time counted as a regression")
+    args = parser.parse_args()
+
+    cases = [(name, changes) for name, changes in benchmark_cases() if not args.filter or args.filter in name]
+    print(f"{'case':<40} {'best':>11} {'median':>11}")
+    results = run_cases(cases, args.repeat)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"environment": environment(), "repeat": args.repeat, "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != environment():
+            print("Warning: the baseline was measured in a different environment")
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old * 1000:.1f}ms -> {new * 1000:.1f}ms ({new / old - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} in {len(results)} cases")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
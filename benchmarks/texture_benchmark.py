@@ -0,0 +1,110 @@
+"""Compare the NumPy texture engine against the old per-cell QPainter loops.
+
+Usage: python benchmarks/texture_benchmark.py [--repeat N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QImage, QPainter, QColor, QPen  # noqa: E402
+from PyQt5.QtCore import Qt  # noqa: E402
+
+from renderer import ensure_app, array_to_qimage  # noqa: E402
+import texture  # noqa: E402
+
+
+RESOLUTIONS = [(800, 600), (1920, 1080), (3840, 2160)]
+
+
+def legacy_texture(width, height, texture_type, intensity):
+    """The original QPainter texture loops, kept here as the reference"""
+    img = QImage(width, height, QImage.Format_ARGB32)
+    img.fill(Qt.transparent)
+    painter = QPainter(img)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setPen(Qt.NoPen)
+    intensity = intensity / 100.0
+
+    if texture_type == "Noise":
+        for x in range(0, width, 5):
+            for y in range(0, height, 5):
+                if random.random() < intensity * 0.3:
+                    size = random.randint(1, 4)
+                    painter.setBrush(QColor(0, 0, 0, random.randint(30, 100)))
+                    painter.drawEllipse(x, y, size, size)
+    elif texture_type == "Lines":
+        for _ in range(int(50 * intensity)):
+            x1 = random.randint(0, width)
+            y1 = random.randint(0, height)
+            x2 = x1 + random.randint(-50, 50)
+            y2 = y1 + random.randint(-50, 50)
+            width_val = random.randint(1, 3)
+            painter.setPen(QPen(QColor(0, 0, 0, random.randint(30, 80)), width_val))
+            painter.drawLine(x1, y1, x2, y2)
+    elif texture_type == "Dots":
+        for _ in range(int(500 * intensity)):
+            x = random.randint(0, width)
+            y = random.randint(0, height)
+            size = random.randint(1, 4)
+            painter.setBrush(QColor(0, 0, 0, random.randint(30, 100)))
+            painter.drawEllipse(x, y, size, size)
+    elif texture_type == "Paper":
+        for x in range(0, width, 3):
+            for y in range(0, height, 3):
+                if random.random() < intensity * 0.1:
+                    painter.setBrush(QColor(200, 200, 200, random.randint(5, 15)))
+                    painter.drawRect(x, y, 2, 2)
+
+    painter.end()
+    return img
+
+
+def mean_alpha(image):
+    """Average alpha of an ARGB32 image, used to check both look alike"""
+    image = image.convertToFormat(QImage.Format_ARGB32)
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    pixels = np.frombuffer(ptr, np.uint32).reshape(image.height(), image.bytesPerLine() // 4)
+    return float((pixels[:, :image.width()] >> 24).mean())
+
+
+def best_time(func, repeat):
+    """Best wall time of repeat calls"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--intensity", type=int, default=30)
+    args = parser.parse_args()
+
+    ensure_app()
+    print(f"{'type':<7} {'size':>10} {'qpainter':>10} {'numpy':>10} {'speedup':>8} {'alpha old/new':>14}")
+    for width, height in RESOLUTIONS:
+        for texture_type in texture.TEXTURE_TYPES:
+            random.seed(1)
+            old_time, old_image = best_time(
+                lambda: legacy_texture(width, height, texture_type, args.intensity), args.repeat)
+            rng = np.random.default_rng(1)
+            new_time, new_pixels = best_time(
+                lambda: texture.create_texture(width, height, texture_type, args.intensity, rng), args.repeat)
+            new_image = array_to_qimage(new_pixels)
+            print(f"{texture_type:<7} {width:>5}x{height:<4} {old_time * 1000:>8.1f}ms {new_time * 1000:>8.1f}ms "
+                  f"{old_time / new_time:>7.1f}x {mean_alpha(old_image):>6.2f}/{mean_alpha(new_image):<6.2f}")
+
+
+if __name__ == "__main__":
+    main()
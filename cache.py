@@ -0,0 +1,144 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtGui import QImage
+
+
+# Bump when a renderer change makes earlier results on disk stale
+CACHE_VERSION = 5
+
+DEFAULT_MEMORY_BUDGET = 128 * 1024 * 1024
+
+
+def default_cache_dir():
+    """Per-user directory for the on-disk tier"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "abstracter", "renders")
+
+
+def settings_key(settings):
+    """Stable content hash of every parameter that affects a render, seed included"""
+    data = {"version": CACHE_VERSION, "settings": settings.to_dict()}
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """Finished renders keyed by settings_key
+
+    Recent images stay in memory while their total size fits memory_budget; the
+    least recently used ones spill to PNG files in disk_dir, where later lookups
+    find them again. A budget of 0 writes every image straight to disk. Safe to
+    share between threads.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, disk_dir=None):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self.entries = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def contains(self, settings):
+        """Whether get() would return an image, without counting a lookup"""
+        key = settings_key(settings)
+        with self.lock:
+            if key in self.entries:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self.disk_path(key))
+
+    def get(self, settings):
+        """Cached QImage for settings, or None"""
+        key = settings_key(settings)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+
+        image = self.load(key)
+        with self.lock:
+            if image is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        # Promote back to memory; the file is already on disk
+        self.store(key, image, on_disk=True)
+        return image
+
+    def put(self, settings, image):
+        """Add a finished render"""
+        self.store(settings_key(settings), image)
+
+    def store(self, key, image, on_disk=False):
+        spilled = []
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = (image, on_disk)
+            self.memory_bytes += image.sizeInBytes()
+            while self.entries and self.memory_bytes > self.memory_budget:
+                old_key, (old_image, old_on_disk) = self.entries.popitem(last=False)
+                self.memory_bytes -= old_image.sizeInBytes()
+                if not old_on_disk:
+                    spilled.append((old_key, old_image))
+
+        # Encode outside the lock so lookups are not blocked behind PNG compression
+        for old_key, old_image in spilled:
+            self.save(old_key, old_image)
+
+    def load(self, key):
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(key)
+        if not os.path.exists(path):
+            return None
+        image = QImage(path)
+        if image.isNull():
+            return None
+        return image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+
+    def save(self, key, image):
+        if not self.disk_dir:
+            return
+        path = self.disk_path(key)
+        if os.path.exists(path):
+            return
+        # Write under a temporary name so a concurrent reader never sees half a file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if image.save(temp_path, "PNG"):
+            os.replace(temp_path, path)
+
+    def flush(self):
+        """Write every in-memory image that is not on disk yet"""
+        with self.lock:
+            pending = [(key, image) for key, (image, on_disk) in self.entries.items() if not on_disk]
+            for key, image in pending:
+                self.entries[key] = (image, True)
+        for key, image in pending:
+            self.save(key, image)
+
+    def clear(self):
+        """Drop the in-memory tier; files on disk are kept"""
+        with self.lock:
+            self.entries.clear()
+            self.memory_bytes = 0
+
+    def stats(self):
+        """Hit and miss counters plus the current memory use"""
+        with self.lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "entries": len(self.entries), "memory_bytes": self.memory_bytes}
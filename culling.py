@@ -0,0 +1,156 @@
+import math
+from dataclasses import replace
+
+import numpy as np
+from PyQt5.QtGui import QImage, QPainter, QPainterPath, QPen, QTransform
+from PyQt5.QtCore import Qt, QPointF, QRect
+
+from scene import shape_copy_bounds
+
+
+# Canvas pixels trimmed off every occluder, so antialiased edges never count as covered
+MARGIN = 1
+
+# Kinds whose fill can hide what lies underneath. Spirals are left out because their
+# flattening follows the output scale, text because glyphs are mostly holes.
+OCCLUDER_KINDS = ("rotated_rect", "ellipse", "polygon", "bezier", "star", "donut", "cross")
+
+# Kinds whose footprint is tested by painting them; the others only by their bounding box
+TRACED_KINDS = OCCLUDER_KINDS + ("arc", "line")
+
+
+def is_opaque(shape):
+    """Whether a shape's fill hides everything underneath it"""
+    if shape.kind not in OCCLUDER_KINDS or shape.color[3] < 255:
+        return False
+    if shape.gradient is not None:
+        return all(color[3] >= 255 for _, color in shape.gradient.stops)
+    return True
+
+
+class OcclusionCuller:
+    """Finds shape copies that later opaque fills paint over completely
+
+    Shapes are visited back to front against a mask of canvas pixels that are
+    already covered. Each copy's footprint is painted without antialiasing,
+    with a pen wide enough to include its stroke and antialiased fringe; a copy
+    whose footprint lies entirely on covered pixels is dropped. Opaque fills
+    then add their interior, shrunk by a wide outline, to the mask. Only pixels
+    an opaque fill covers fully are ever marked, so dropping a copy leaves the
+    rendered image unchanged at the canvas size or larger.
+    """
+
+    def __init__(self, renderer, width, height):
+        self.renderer = renderer
+        self.width = width
+        self.height = height
+        self.covered = np.zeros((height, width), dtype=bool)
+        # Footprints are painted into the image and read back through an array over its pixels
+        self.image = QImage(width, height, QImage.Format_Grayscale8)
+        self.image.fill(0)
+        bits = self.image.bits()
+        bits.setsize(self.image.sizeInBytes())
+        self.scratch = np.frombuffer(bits, np.uint8).reshape(height, self.image.bytesPerLine())[:, :width]
+
+    def cull(self, shapes):
+        """Shapes left to paint, in painting order, and how many copies were dropped"""
+        painter = QPainter(self.image)
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        visible = []
+        skipped = 0
+        try:
+            for shape in reversed(shapes):
+                transforms = shape.transforms or (None,)
+                opaque = is_opaque(shape)
+
+                kept = []
+                # Later copies of the same shape are painted over earlier ones too
+                for transform, box in reversed(list(zip(transforms, shape_copy_bounds(shape)))):
+                    if self.hidden(painter, shape, transform, box):
+                        skipped += 1
+                        continue
+                    kept.append(transform)
+                    if opaque:
+                        self.cover(painter, shape, transform, box)
+
+                if not kept:
+                    continue
+                if len(kept) < len(transforms):
+                    shape = replace(shape, transforms=tuple(reversed(kept)))
+                visible.append(shape)
+        finally:
+            painter.end()
+
+        visible.reverse()
+        return visible, skipped
+
+    def pixel_box(self, box, grow=0):
+        """Integer (x0, y0, x1, y1) pixel range touched by a float box, clipped to the canvas"""
+        x0, y0, x1, y1 = box
+        return (max(0, math.floor(x0) - grow), max(0, math.floor(y0) - grow),
+                min(self.width, math.ceil(x1) + grow), min(self.height, math.ceil(y1) + grow))
+
+    def hidden(self, painter, shape, transform, box):
+        """Whether nothing of a copy could show, including copies entirely off the canvas"""
+        x0, y0, x1, y1 = self.pixel_box(box)
+        if x0 >= x1 or y0 >= y1:
+            return True
+        covered = self.covered[y0:y1, x0:x1]
+        if covered.all():
+            return True
+        if shape.kind not in TRACED_KINDS or not covered.any():
+            return False
+
+        # The stroke reaches half its width out, antialiasing up to one more pixel
+        width = (shape.stroke_width if shape.stroke is not None else 0) + 2 * (MARGIN + 1)
+        x0, y0, x1, y1 = self.pixel_box(box, grow=math.ceil(width))
+        self.trace(painter, shape, transform, (x0, y0, x1, y1), Qt.white, QPen(Qt.white, width))
+        footprint = self.scratch[y0:y1, x0:x1] != 0
+        return not (footprint & ~self.covered[y0:y1, x0:x1]).any()
+
+    def cover(self, painter, shape, transform, box):
+        """Add the pixels a copy's fill covers completely to the mask"""
+        x0, y0, x1, y1 = self.pixel_box(box)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.trace(painter, shape, transform, (x0, y0, x1, y1), Qt.white, Qt.NoPen)
+        # Erase a band along the outline: what is left is at least MARGIN inside the edge
+        painter.save()
+        painter.setClipRect(QRect(x0, y0, x1 - x0, y1 - y0))
+        painter.setTransform(QTransform(*transform) if transform is not None else QTransform())
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(Qt.black, 2 * (MARGIN + 1)))
+        self.draw(painter, shape)
+        painter.restore()
+        self.covered[y0:y1, x0:x1] |= self.scratch[y0:y1, x0:x1] != 0
+
+    def trace(self, painter, shape, transform, rect, brush, pen):
+        """Clear rect in the scratch image and paint the shape into it with one brush and pen"""
+        x0, y0, x1, y1 = rect
+        self.scratch[y0:y1, x0:x1] = 0
+        painter.save()
+        # Clip in device pixels so nothing lands outside the part that was cleared
+        painter.setClipRect(QRect(x0, y0, x1 - x0, y1 - y0))
+        if transform is not None:
+            painter.setTransform(QTransform(*transform))
+        painter.setBrush(brush)
+        painter.setPen(pen)
+        self.draw(painter, shape)
+        painter.restore()
+
+    def draw(self, painter, shape):
+        if shape.kind == "bezier":
+            # The fill closes the curve with a straight line, and so must the outline that trims it
+            start, ctrl1, ctrl2, end = [QPointF(x, y) for x, y in shape.geometry["points"]]
+            path = QPainterPath()
+            path.moveTo(start)
+            path.cubicTo(ctrl1, ctrl2, end)
+            path.closeSubpath()
+            painter.drawPath(path)
+            return
+        getattr(self.renderer, f"draw_{shape.kind}")(painter, shape.geometry)
+
+
+def cull_occluded(renderer, shapes, width, height):
+    """Drop shape copies hidden under later opaque fills; returns (shapes, skipped copies)"""
+    return OcclusionCuller(renderer, width, height).cull(shapes)
@@ -0,0 +1,97 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from scene import DENSE_DIRECTIONS, RenderCancelled
+
+
+# Stamp cells drawn at a time, to bound memory with millions of primitives
+SPLAT_BLOCK = 1 << 22
+
+# Quarter-size drafts paint one primitive in this many, which keeps the look of the full density
+DRAFT_STEP = 16
+
+
+@lru_cache(maxsize=None)
+def stamp(kind, size, direction=0):
+    """(n, 2) integer (dx, dy) pixel offsets a primitive of this kind and size covers"""
+    if kind == "Dashes":
+        # A one pixel line twice the size long through the center
+        angle = math.pi * direction / DENSE_DIRECTIONS
+        t = np.linspace(-size, size, 4 * size + 1)
+        cells = np.rint(np.column_stack((t * math.cos(angle), t * math.sin(angle)))).astype(np.int64)
+        return np.unique(cells, axis=0)
+
+    offset = np.arange(size) - size // 2
+    dx, dy = np.meshgrid(offset, offset)
+    cells = np.column_stack((dx.ravel(), dy.ravel()))
+    if kind == "Dots":
+        # Keep the cells whose centers lie in the disc, trimmed a little so 3px dots are not squares
+        center = (size - 1) / 2 - size // 2
+        radius = size / 2 - 0.25
+        keep = ((cells - center) ** 2).sum(axis=1) <= max(radius, 0.5) ** 2
+        cells = cells[keep]
+    return cells
+
+
+def stamp_indices(x, y, cells, width, height):
+    """Flat pixel indices covered by primitives centered at (x, y), one entry per covering"""
+    px = (x[:, None] + cells[:, 0]).ravel()
+    py = (y[:, None] + cells[:, 1]).ravel()
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    return py[inside] * width + px[inside]
+
+
+def composite(pixels, indices, color, alpha):
+    """Draw color at alpha over the flat pixels at indices, once for every time an index occurs
+
+    Only the covered pixels are counted and touched, so the cost follows the number
+    of indices, not the canvas size.
+    """
+    covered, counts = np.unique(indices, return_counts=True)
+    # k draws of alpha a leave (1 - a) ** k of what was underneath
+    remaining = np.power(np.float32(1 - alpha), counts).astype(np.float32)[:, None]
+    pixels[covered] = pixels[covered] * remaining + color * (1 - remaining)
+
+
+def splat(layer, width, height, scale=1.0, step=1, cancelled=None):
+    """Paint a DenseLayer into premultiplied (height, width, 4) floats
+
+    Every batch of one style is painted at once: a pixel covered k times by a
+    color of alpha a ends up as k source-over draws would leave it. Only every
+    step-th primitive is painted, for quick drafts. No antialiasing.
+    """
+    pixels = np.zeros((height * width, 4), dtype=np.float32)
+    for style, points in layer.groups():
+        if cancelled is not None and cancelled():
+            raise RenderCancelled()
+        points = points[::step]
+        if not len(points):
+            continue
+
+        r, g, b, a = (c / 255 for c in layer.styles[style])
+        color = np.array([r, g, b, 1], dtype=np.float32)
+        x = np.floor(points["x"] * scale).astype(np.int64)
+        y = np.floor(points["y"] * scale).astype(np.int64)
+        sizes = np.maximum(1, np.rint(points["size"] * scale)).astype(np.int64)
+        directions = points["angle"] if layer.kind == "Dashes" else np.zeros(len(points), dtype=np.uint8)
+        # Gather the pixels of every distinct stamp and draw them in blocks of SPLAT_BLOCK cells;
+        # draws of one color add up, so splitting a batch into blocks leaves the same result
+        pending, pending_size = [], 0
+        keys = sizes * DENSE_DIRECTIONS + directions
+        for key in np.unique(keys).tolist():
+            rows = np.flatnonzero(keys == key)
+            size, direction = divmod(key, DENSE_DIRECTIONS)
+            cells = stamp(layer.kind, size, direction)
+            block = max(1, SPLAT_BLOCK // len(cells))
+            for start in range(0, len(rows), block):
+                part = rows[start:start + block]
+                pending.append(stamp_indices(x[part], y[part], cells, width, height))
+                pending_size += len(part) * len(cells)
+                if pending_size >= SPLAT_BLOCK:
+                    composite(pixels, np.concatenate(pending), color, a)
+                    pending, pending_size = [], 0
+        if pending:
+            composite(pixels, np.concatenate(pending), color, a)
+    return pixels.reshape(height, width, 4)
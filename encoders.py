@@ -0,0 +1,98 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+
+
+def argb32_to_rgb(pixels):
+    """(rows, width, 3) uint8 RGB of a (rows, width) uint32 array of opaque ARGB32 pixels"""
+    rgb = np.empty(pixels.shape + (3,), dtype=np.uint8)
+    rgb[:, :, 0] = (pixels >> 16) & 0xFF
+    rgb[:, :, 1] = (pixels >> 8) & 0xFF
+    rgb[:, :, 2] = pixels & 0xFF
+    return rgb
+
+
+class PNGStreamWriter:
+    """Writes an RGB PNG one band of rows at a time, so the full image never sits in memory
+
+    path may also be a binary file object, which is left open when done.
+    """
+
+    def __init__(self, path, width, height, compression=6):
+        self.path = path
+        self.owns_file = not hasattr(path, "write")
+        self.file = open(path, "wb") if self.owns_file else path
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.compressor = zlib.compressobj(compression)
+
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bits per channel, color type 2 (RGB), no interlacing
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write_rows(self, rows):
+        """Append a (rows, width, 3) uint8 array of RGB pixels"""
+        # Every PNG scanline starts with its filter type; 0 means unfiltered
+        filtered = np.zeros((rows.shape[0], self.width * 3 + 1), dtype=np.uint8)
+        filtered[:, 1:] = rows.reshape(rows.shape[0], -1)
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self.write_chunk(b"IDAT", data)
+        self.rows_written += rows.shape[0]
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.abort()
+            raise ValueError(f"Wrote {self.rows_written} of {self.height} rows")
+        self.write_chunk(b"IDAT", self.compressor.flush())
+        self.write_chunk(b"IEND", b"")
+        if self.owns_file:
+            self.file.close()
+
+    def abort(self):
+        """Give up on the image, removing the partial file if this writer opened it"""
+        if self.owns_file:
+            self.file.close()
+            os.remove(self.path)
+
+
+class PPMStreamWriter:
+    """Writes a binary PPM one band of rows at a time"""
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.height = height
+        self.rows_written = 0
+        self.file = open(path, "wb")
+        self.file.write(f"P6\n{width} {height}\n255\n".encode("ascii"))
+
+    def write_rows(self, rows):
+        self.file.write(np.ascontiguousarray(rows).tobytes())
+        self.rows_written += rows.shape[0]
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.abort()
+            raise ValueError(f"Wrote {self.rows_written} of {self.height} rows")
+        self.file.close()
+
+    def abort(self):
+        """Give up on the image, removing the partial file"""
+        self.file.close()
+        os.remove(self.path)
+
+
+def open_stream_writer(path, width, height, fmt=None):
+    """Pick a row streaming encoder from fmt or the file extension"""
+    if (fmt or path.rsplit(".", 1)[-1]).lower() == "ppm":
+        return PPMStreamWriter(path, width, height)
+    return PNGStreamWriter(path, width, height)
@@ -0,0 +1,153 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from encoders import PNGStreamWriter, PPMStreamWriter
+
+
+EXPORT_FORMATS = ("png", "jpg", "webp", "ppm", "raw")
+
+# Formats only Qt encodes; png, ppm and raw are written here and work with either backend
+QT_FORMATS = {"jpg": b"jpeg", "webp": b"webp"}
+
+# Rows encoded between progress reports
+EXPORT_BAND = 64
+
+# JPEG and WebP quality the GUI and command line accept, smallest file to best image
+MIN_QUALITY = 1
+MAX_QUALITY = 100
+
+
+@dataclass(frozen=True)
+class ExportOptions:
+    """Encoder settings for exported images"""
+    png_compression: int = 6  # zlib level, 0 (fastest) to 9 (smallest)
+    quality: int = 90  # JPEG and WebP quality, MIN_QUALITY (smallest) to MAX_QUALITY (best)
+
+
+def export_format(path, fmt=None):
+    """Export format named by fmt or the file extension"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    fmt = {"jpeg": "jpg", "rgba": "raw"}.get(fmt, fmt)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; choose one of {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+def qimage_rgb_rows(image):
+    """Copy an opaque QImage out as a (height, width, 3) uint8 RGB array"""
+    from PyQt5.QtGui import QImage
+    image = image.convertToFormat(QImage.Format_RGB888)
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    rows = np.frombuffer(ptr, np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 3].reshape(image.height(), image.width(), 3).copy()
+
+
+def rgb_rows(image):
+    """(height, width, 3) uint8 RGB of a QImage or numpy backend RasterImage"""
+    if hasattr(image, "rgb"):
+        return image.rgb()
+    return qimage_rgb_rows(image)
+
+
+def rgba_bytes(image):
+    """Raw RGBA bytes of a QImage or RasterImage, row after row with no padding"""
+    if hasattr(image, "rgba"):
+        return image.rgba().tobytes()
+    from PyQt5.QtGui import QImage
+    image = image.convertToFormat(QImage.Format_RGBA8888)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    return bytes(bits)
+
+
+def export_image(image, path, fmt=None, options=ExportOptions(), progress=None):
+    """Encode a finished render to path, calling progress(done, total) as rows are written
+
+    png and ppm are streamed band by band, so progress follows the encoder; the
+    Qt encoders report only once they are done. Raises IOError if writing fails.
+    """
+    fmt = export_format(path, fmt)
+    height = image.height()
+    if fmt in QT_FORMATS:
+        if hasattr(image, "rgb"):
+            raise ValueError(f"The numpy backend exports png, ppm or raw, not {fmt}")
+        from PyQt5.QtGui import QImageWriter
+        writer = QImageWriter(path, QT_FORMATS[fmt])
+        writer.setQuality(options.quality)
+        if not writer.write(image):
+            raise IOError(f"Could not write {path}: {writer.errorString()}")
+    elif fmt == "raw":
+        with open(path, "wb") as f:
+            f.write(rgba_bytes(image))
+    else:
+        rows = rgb_rows(image)
+        if fmt == "png":
+            writer = PNGStreamWriter(path, image.width(), height, compression=options.png_compression)
+        else:
+            writer = PPMStreamWriter(path, image.width(), height)
+        try:
+            for y in range(0, height, EXPORT_BAND):
+                writer.write_rows(rows[y:y + EXPORT_BAND])
+                if progress:
+                    progress(min(y + EXPORT_BAND, height), height)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        return path
+
+    if progress:
+        progress(height, height)
+    return path
+
+
+def png_bytes(image, options=ExportOptions()):
+    """Encode a finished render to PNG in memory"""
+    buffer = io.BytesIO()
+    writer = PNGStreamWriter(buffer, image.width(), image.height(), compression=options.png_compression)
+    writer.write_rows(rgb_rows(image))
+    writer.close()
+    return buffer.getvalue()
+
+
+class Exporter:
+    """Encodes images on background threads, so the next render can start while the last one is saved
+
+    submit() returns a Future of the written path. Use as a context manager,
+    or call close(), to wait for the encodes still running.
+    """
+
+    def __init__(self, threads=1, options=ExportOptions()):
+        self.options = options
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def submit(self, image, path, fmt=None, progress=None):
+        return self.executor.submit(export_image, image, path, fmt, self.options, progress)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_export_arguments(parser):
+    """Register the encoder options on an argparse parser"""
+    parser.add_argument("--png-compression", type=int, default=6, choices=range(10), metavar="0-9",
+                        help="PNG zlib level: 0 is fastest, 9 smallest")
+    parser.add_argument("--quality", type=int, default=90, choices=range(MIN_QUALITY, MAX_QUALITY + 1),
+                        metavar=f"{MIN_QUALITY}-{MAX_QUALITY}",
+                        help=f"JPEG and WebP quality: {MIN_QUALITY} is smallest, {MAX_QUALITY} best")
+
+
+def export_options(args):
+    """ExportOptions from parsed arguments"""
+    return ExportOptions(png_compression=args.png_compression, quality=args.quality)
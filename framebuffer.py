@@ -0,0 +1,70 @@
+import numpy as np
+
+from encoders import open_stream_writer, argb32_to_rgb
+
+
+# Rows converted and encoded at a time when saving
+SAVE_BAND = 256
+
+
+class FrameBuffer:
+    """ARGB32 premultiplied pixels in a memory-mapped file instead of the heap
+
+    The OS pages the pixels in and out as they are painted, so renders larger
+    than memory still fit. The file holds nothing but height rows of width
+    native-endian uint32 pixels, the QImage.Format_ARGB32_Premultiplied layout,
+    so another process can open it by size alone. Only image() needs Qt.
+    """
+
+    def __init__(self, path, width, height, mode="w+"):
+        self.path = path
+        self.pixels = np.memmap(path, dtype=np.uint32, mode=mode, shape=(height, width))
+
+    @classmethod
+    def open(cls, path, width, height, writable=False):
+        """Map an existing framebuffer file, read-only unless writable"""
+        return cls(path, width, height, mode="r+" if writable else "r")
+
+    def width(self):
+        return self.pixels.shape[1]
+
+    def height(self):
+        return self.pixels.shape[0]
+
+    def image(self):
+        """QImage painting straight into the mapped pixels; keep the framebuffer open while it is used"""
+        from renderer import buffer_to_qimage
+        return buffer_to_qimage(self.pixels)
+
+    def rgb_rows(self, start, stop):
+        """(rows, width, 3) uint8 RGB of rows start to stop, assuming opaque pixels"""
+        return argb32_to_rgb(self.pixels[start:stop])
+
+    def save(self, path, fmt=None, progress=None):
+        """Encode the pixels to a PNG or PPM band by band, never holding more than a band in memory"""
+        height = self.height()
+        writer = open_stream_writer(path, self.width(), height, fmt)
+        try:
+            for start in range(0, height, SAVE_BAND):
+                writer.write_rows(self.rgb_rows(start, start + SAVE_BAND))
+                if progress:
+                    progress(min(start + SAVE_BAND, height), height)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+    def flush(self):
+        """Write painted pixels back to the file"""
+        self.pixels.flush()
+
+    def close(self):
+        if self.pixels.mode != "r":
+            self.flush()
+        self.pixels = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,126 @@
+import os
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, QLabel, QSpinBox
+from PyQt5.QtGui import QPixmap, QIcon
+from PyQt5.QtCore import Qt, QSize, QThreadPool, pyqtSignal
+
+from renderer import ArtRenderer
+from workers import ThumbnailJob, ThumbnailSignals
+
+
+GALLERY_COLUMNS = 8
+GALLERY_ROWS = 8
+GALLERY_SEEDS = GALLERY_COLUMNS * GALLERY_ROWS
+
+# Thumbnails are drafts of the full scene at this fraction of the canvas size
+THUMBNAIL_SCALE = 0.125
+
+MAX_SEED = 999999
+
+
+class SeedGallery(QWidget):
+    """Window showing drafts of a page of consecutive seeds, painted in parallel as they finish
+
+    Thumbnails are drafts of the very scene a full render of the seed draws, and
+    the gallery's renderer keeps every scene of the page, so a picked seed
+    does not generate its scene again. Emits seed_chosen(seed) when a tile is clicked.
+    """
+
+    seed_chosen = pyqtSignal(int)
+
+    def __init__(self, settings_source, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle("Seed Gallery")
+        # Called for the current settings whenever a page is painted
+        self.settings_source = settings_source
+        # Two pages of scene records, so going back a page stays cheap
+        self.renderer = ArtRenderer(cache_size=2 * GALLERY_SEEDS)
+
+        self.generation = 0
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(os.cpu_count() or 1)
+        self.signals = ThumbnailSignals()
+        self.signals.finished.connect(self.on_thumbnail)
+        self.signals.failed.connect(self.on_thumbnail_failed)
+
+        layout = QVBoxLayout()
+        controls = QHBoxLayout()
+        self.previous_button = QPushButton("Previous")
+        self.previous_button.clicked.connect(lambda: self.show_page(self.first_seed - GALLERY_SEEDS))
+        controls.addWidget(self.previous_button)
+
+        controls.addWidget(QLabel("First Seed:"))
+        self.first_seed_spin = QSpinBox()
+        self.first_seed_spin.setRange(1, MAX_SEED - GALLERY_SEEDS + 1)
+        self.first_seed_spin.setValue(1)
+        self.first_seed_spin.editingFinished.connect(lambda: self.show_page(self.first_seed_spin.value()))
+        controls.addWidget(self.first_seed_spin)
+
+        self.next_button = QPushButton("Next")
+        self.next_button.clicked.connect(lambda: self.show_page(self.first_seed + GALLERY_SEEDS))
+        controls.addWidget(self.next_button)
+
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.setToolTip("Paint the page again with the current settings")
+        self.refresh_button.clicked.connect(lambda: self.show_page(self.first_seed))
+        controls.addWidget(self.refresh_button)
+        layout.addLayout(controls)
+
+        grid = QGridLayout()
+        grid.setSpacing(2)
+        self.tiles = []
+        for index in range(GALLERY_SEEDS):
+            tile = QPushButton()
+            tile.setFlat(True)
+            tile.clicked.connect(lambda checked, index=index: self.seed_chosen.emit(self.first_seed + index))
+            grid.addWidget(tile, index // GALLERY_COLUMNS, index % GALLERY_COLUMNS)
+            self.tiles.append(tile)
+        layout.addLayout(grid)
+        self.setLayout(layout)
+        self.first_seed = 1
+
+    def is_stale(self, generation):
+        return generation != self.generation
+
+    def show_page(self, first_seed):
+        """Paint thumbnails of GALLERY_SEEDS seeds starting at first_seed, replacing the current page"""
+        first_seed = max(1, min(first_seed, MAX_SEED - GALLERY_SEEDS + 1))
+        self.first_seed = first_seed
+        self.first_seed_spin.setValue(first_seed)
+        self.generation += 1
+        # Queued thumbnails of the old page would only be skipped, so drop them now
+        self.pool.clear()
+
+        settings = self.settings_source()
+        size = QSize(max(1, int(settings.width * THUMBNAIL_SCALE)), max(1, int(settings.height * THUMBNAIL_SCALE)))
+        for index, tile in enumerate(self.tiles):
+            tile.setIcon(QIcon())
+            tile.setIconSize(size)
+            tile.setFixedSize(size + QSize(4, 4))
+            tile.setText(str(first_seed + index))
+            tile.setToolTip(f"Seed {first_seed + index}")
+            self.pool.start(ThumbnailJob(self.generation, index, self.renderer,
+                                         settings.replace(seed=first_seed + index), THUMBNAIL_SCALE,
+                                         self.is_stale, self.signals))
+
+    def on_thumbnail(self, generation, index, image):
+        """Show a finished thumbnail unless its page was replaced meanwhile"""
+        if self.is_stale(generation):
+            return
+        tile = self.tiles[index]
+        tile.setText("")
+        tile.setIcon(QIcon(QPixmap.fromImage(image)))
+
+    def on_thumbnail_failed(self, generation, index, message):
+        """Show on the tile why its seed could not be drawn"""
+        if self.is_stale(generation):
+            return
+        tile = self.tiles[index]
+        tile.setText(f"{self.first_seed + index}\nFailed")
+        tile.setToolTip(f"Seed {self.first_seed + index} could not be drawn: {message}")
+
+    def closeEvent(self, event):
+        """Stop painting thumbnails nobody will see"""
+        self.generation += 1
+        self.pool.clear()
+        super().closeEvent(event)
@@ -0,0 +1,43 @@
+import math
+import numpy as np
+
+
+# Longest straight segment, in device pixels, a curve is flattened into
+SEGMENT_LENGTH = 12.0
+
+# Fewest segments per spiral turn, so tiny spirals still look round
+MIN_SEGMENTS_PER_TURN = 8
+
+
+def spiral_vertices(cx, cy, size, turns, scale=1.0):
+    """(n, 2) vertex array of a spiral: the center, then a radius growing from size to twice the size
+
+    The number of segments per turn follows the outer radius on screen (size * scale), so small or
+    scaled-down spirals get fewer vertices and print-size ones stay smooth.
+    """
+    outer = 2 * math.pi * 2 * size * scale
+    per_turn = max(MIN_SEGMENTS_PER_TURN, int(math.ceil(outer / SEGMENT_LENGTH)))
+    count = turns * per_turn
+
+    t = np.arange(count) / count
+    angle = t * (turns * 2 * math.pi)
+    radius = size * (1 + t)
+
+    vertices = np.empty((count + 1, 2))
+    vertices[0] = cx, cy
+    vertices[1:, 0] = cx + radius * np.cos(angle)
+    vertices[1:, 1] = cy + radius * np.sin(angle)
+    return vertices
+
+
+def star_vertices(cx, cy, outer, inner, points):
+    """(2 * points, 2) vertex array of a star, alternating outer and inner radius"""
+    i = np.arange(points * 2)
+    angle = math.pi * i / points
+    radius = np.where(i % 2 == 1, inner, outer)
+    return np.column_stack((cx + radius * np.cos(angle), cy + radius * np.sin(angle)))
+
+
+def polygon_vertices(points):
+    """(n, 2) vertex array of a polygon's point list"""
+    return np.asarray(points, dtype=float).reshape(-1, 2)
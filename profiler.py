@@ -0,0 +1,73 @@
+import time
+from collections import defaultdict
+
+
+class Stage:
+    """Context manager adding the wall time of its block to one profiler stage"""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+class Profiler:
+    """Wall time and call count per render stage, summed over one render
+
+    Stages are named like "background" or "draw/ellipse" and do not overlap,
+    so their times add up to the part of the render they cover.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.created = time.perf_counter()
+
+    def stage(self, name):
+        return Stage(self, name)
+
+    def add(self, name, seconds, count=1):
+        self.seconds[name] += seconds
+        self.counts[name] += count
+
+    def report(self):
+        """JSON-friendly {"total_ms": ..., "stages": {name: {"ms": ..., "count": ...}}}, slowest stage first"""
+        stages = sorted(self.seconds, key=self.seconds.get, reverse=True)
+        return {
+            "total_ms": round((time.perf_counter() - self.created) * 1000, 3),
+            "stages": {name: {"ms": round(self.seconds[name] * 1000, 3), "count": self.counts[name]}
+                       for name in stages},
+        }
+
+
+class NullProfiler:
+    """Stands in for a Profiler when nothing is measured, at almost no cost"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def stage(self, name):
+        return self
+
+    def add(self, name, seconds, count=1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def summarize(report, limit=4):
+    """Short "total (stage ms, ...)" line of a report for the status bar"""
+    stages = ", ".join(f"{name} {stage['ms']:.0f}ms" for name, stage in list(report["stages"].items())[:limit])
+    return f"{report['total_ms']:.0f}ms ({stages})" if stages else f"{report['total_ms']:.0f}ms"
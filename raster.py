@@ -0,0 +1,488 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from scene import SceneGenerator, DenseLayer, RenderCancelled
+from dense import DRAFT_STEP, splat
+from encoders import open_stream_writer
+from profiler import NULL_PROFILER, Profiler
+import geometry
+import texture
+
+
+# Samples per pixel along each axis when measuring coverage
+SUPERSAMPLE = 4
+
+# Longest chord, in device pixels, ellipses and Bezier curves are flattened into
+CURVE_SEGMENT = 3.0
+
+GRADIENT_TABLE_SIZE = 256
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+BLACK = (0, 0, 0, 255)
+
+
+# Affine transforms use the (m11, m12, m21, m22, dx, dy) layout of scene records and QTransform:
+# x' = m11 * x + m21 * y + dx, y' = m12 * x + m22 * y + dy
+
+def combine(first, then):
+    """Transform that applies first, then then"""
+    a11, a12, a21, a22, adx, ady = first
+    b11, b12, b21, b22, bdx, bdy = then
+    return (a11 * b11 + a12 * b21, a11 * b12 + a12 * b22,
+            a21 * b11 + a22 * b21, a21 * b12 + a22 * b22,
+            adx * b11 + ady * b21 + bdx, adx * b12 + ady * b22 + bdy)
+
+
+def inverse(m):
+    m11, m12, m21, m22, dx, dy = m
+    det = m11 * m22 - m12 * m21
+    i11, i12, i21, i22 = m22 / det, -m12 / det, -m21 / det, m11 / det
+    return (i11, i12, i21, i22, -(dx * i11 + dy * i21), -(dx * i12 + dy * i22))
+
+
+def translation(dx, dy):
+    return (1.0, 0.0, 0.0, 1.0, float(dx), float(dy))
+
+
+def rotation(degrees):
+    """Clockwise on screen, like QPainter.rotate"""
+    c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+    return (c, s, -s, c, 0.0, 0.0)
+
+
+def scaling(sx, sy):
+    return (float(sx), 0.0, 0.0, float(sy), 0.0, 0.0)
+
+
+def transform_points(m, points):
+    """Map an (..., 2) array of points"""
+    m11, m12, m21, m22, dx, dy = m
+    x, y = points[..., 0], points[..., 1]
+    return np.stack((m11 * x + m21 * y + dx, m12 * x + m22 * y + dy), axis=-1)
+
+
+def transform_scale(m):
+    """How many device pixels one unit covers under m"""
+    return abs(m[0] * m[3] - m[1] * m[2]) ** 0.5
+
+
+# Outlines
+
+def rect_points(x, y, w, h):
+    return np.array([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], dtype=float)
+
+
+def ellipse_points(x, y, w, h, scale=1.0):
+    """Closed ellipse outline inside the box, clockwise on screen from 3 o'clock"""
+    circumference = math.pi * (abs(w) + abs(h)) / 2 * scale
+    count = max(16, int(math.ceil(circumference / CURVE_SEGMENT)))
+    angle = np.arange(count) * (2 * math.pi / count)
+    return np.column_stack((x + w / 2 * (1 + np.cos(angle)), y + h / 2 * (1 + np.sin(angle))))
+
+
+def arc_points(x, y, w, h, start, span, scale=1.0):
+    """Open arc outline; angles in degrees counter-clockwise from 3 o'clock, like QPainter.drawArc"""
+    length = math.pi * (abs(w) + abs(h)) / 2 * scale * abs(span) / 360
+    count = max(2, int(math.ceil(length / CURVE_SEGMENT)) + 1)
+    angle = np.radians(start + span * np.linspace(0, 1, count))
+    return np.column_stack((x + w / 2 * (1 + np.cos(angle)), y + h / 2 * (1 - np.sin(angle))))
+
+
+def bezier_points(points, scale=1.0):
+    """Flattened cubic Bezier curve through four control points"""
+    p = np.asarray(points, dtype=float)
+    length = np.hypot(*np.diff(p, axis=0).T).sum() * scale
+    count = max(2, int(math.ceil(length / CURVE_SEGMENT)) + 1)
+    t = np.linspace(0, 1, count)[:, None]
+    return ((1 - t) ** 3 * p[0] + 3 * (1 - t) ** 2 * t * p[1] + 3 * (1 - t) * t ** 2 * p[2] + t ** 3 * p[3])
+
+
+def oriented(polygons):
+    """(k, n, 2) polygon batch turned to positive signed area, so nonzero filling gives their union"""
+    x, y = polygons[..., 0], polygons[..., 1]
+    area = (x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)
+    return np.where((area < 0)[:, None, None], polygons[:, ::-1], polygons)
+
+
+def polygon_edges(polygons):
+    """(E, 4) array of (x0, y0, x1, y1) edges of closed polygons, given as a list or a (k, n, 2) batch"""
+    if isinstance(polygons, np.ndarray):
+        return np.concatenate((polygons, np.roll(polygons, -1, axis=1)), axis=-1).reshape(-1, 4)
+    polygons = [p for p in polygons if len(p) >= 2]
+    if not polygons:
+        return np.zeros((0, 4))
+    return np.concatenate([np.column_stack((p, np.roll(p, -1, axis=0))) for p in polygons])
+
+
+def stroke_polygons(points, closed, width):
+    """Pen stroke with square caps and bevel joins, as quad and triangle batches whose union is the stroke"""
+    if closed:
+        points = np.vstack((points, points[:1]))
+    start, end = points[:-1], points[1:]
+    direction = end - start
+    length = np.hypot(direction[:, 0], direction[:, 1])
+    keep = length > 1e-9
+    start, end, direction, length = start[keep], end[keep], direction[keep], length[keep]
+    if not len(start):
+        return []
+
+    unit = direction / length[:, None]
+    normal = np.column_stack((-unit[:, 1], unit[:, 0])) * (width / 2)
+    if not closed:
+        # Square caps reach half the pen width past both ends
+        start = start.copy()
+        end = end.copy()
+        start[0] -= unit[0] * width / 2
+        end[-1] += unit[-1] * width / 2
+
+    quads = np.stack((start + normal, end + normal, end - normal, start - normal), axis=1)
+
+    # Bevel joins fill the wedge between consecutive segments on both sides
+    joins = np.arange(0 if closed else 1, len(start))
+    vertex = end[joins - 1]
+    before, after = normal[joins - 1], normal[joins]
+    triangles = np.concatenate((np.stack((vertex, vertex + before, vertex + after), axis=1),
+                                np.stack((vertex, vertex - before, vertex - after), axis=1)))
+    return [oriented(quads), oriented(triangles)] if len(triangles) else [oriented(quads)]
+
+
+@dataclass
+class Op:
+    """One QPainter draw call: filled polygons (even-odd) and stroked polylines in local coordinates"""
+    fill: list
+    strokes: list
+    transform: tuple = IDENTITY
+
+
+class RasterImage:
+    """Finished numpy render: an (height, width, 4) float array of premultiplied RGBA in 0.0-1.0"""
+
+    def __init__(self, pixels):
+        self.pixels = pixels
+
+    def width(self):
+        return self.pixels.shape[1]
+
+    def height(self):
+        return self.pixels.shape[0]
+
+    def rgb(self):
+        """(height, width, 3) uint8 RGB, assuming an opaque image"""
+        return np.rint(np.clip(self.pixels[:, :, :3], 0, 1) * 255).astype(np.uint8)
+
+    def rgba(self):
+        """(height, width, 4) uint8 straight RGBA"""
+        alpha = self.pixels[:, :, 3:]
+        straight = np.divide(self.pixels[:, :, :3], alpha, out=np.zeros_like(self.pixels[:, :, :3]), where=alpha > 0)
+        channels = np.concatenate((straight, alpha), axis=2)
+        return np.rint(np.clip(channels, 0, 1) * 255).astype(np.uint8)
+
+    def to_argb32(self):
+        """(height, width) uint32 pixels in QImage.Format_ARGB32_Premultiplied layout"""
+        channels = np.rint(np.clip(self.pixels, 0, 1) * 255).astype(np.uint32)
+        r, g, b, a = channels[:, :, 0], channels[:, :, 1], channels[:, :, 2], channels[:, :, 3]
+        return (a << 24) | (r << 16) | (g << 8) | b
+
+    def save(self, path, fmt=None):
+        """Write a PNG or PPM file, chosen by fmt or the file extension; returns True like QImage.save"""
+        fmt = (fmt or path.rsplit(".", 1)[-1]).lower()
+        if fmt not in ("png", "ppm"):
+            raise ValueError(f"The numpy backend writes png or ppm, not {fmt}")
+        writer = open_stream_writer(path, self.width(), self.height(), fmt)
+        writer.write_rows(self.rgb())
+        writer.close()
+        return True
+
+
+class Canvas:
+    """Premultiplied RGBA float buffer that antialiased polygons are composited onto"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((height, width, 4), dtype=np.float32)
+
+    def coverage(self, edges, x0, y0, x1, y1, nonzero=False):
+        """Fraction of every pixel in [x0, x1) x [y0, y1) inside the outline given by its edges"""
+        ss = SUPERSAMPLE
+        rows, columns = (y1 - y0) * ss, (x1 - x0) * ss
+
+        # Sample space: one unit per subsample, origin at the box corner
+        edges = (edges - (x0, y0, x0, y0)) * ss
+        edges = edges[edges[:, 1] != edges[:, 3]]
+        ex0, ey0, ex1, ey1 = edges.T
+        direction = np.where(ey1 > ey0, 1, -1)
+
+        # Each edge crosses the subsample rows whose centers lie in [min y, max y)
+        low = np.clip(np.ceil(np.minimum(ey0, ey1) - 0.5), 0, rows).astype(np.int64)
+        high = np.clip(np.ceil(np.maximum(ey0, ey1) - 0.5), 0, rows).astype(np.int64)
+        counts = high - low
+        edge_index = np.repeat(np.arange(len(edges)), counts)
+        row = np.repeat(low - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        xc = ex0[edge_index] + (row + 0.5 - ey0[edge_index]) * ((ex1 - ex0) / (ey1 - ey0))[edge_index]
+        column = np.clip(np.ceil(xc - 0.5), 0, columns).astype(np.int64)
+
+        # Winding changes where an edge crosses a row; a running sum gives the winding of each sample
+        # Parity only needs the low bit, so even-odd sums can wrap around in a single byte
+        dtype = np.int16 if nonzero else np.uint8
+        delta = np.zeros((rows, columns + 1), dtype=dtype)
+        np.add.at(delta, (row, column), direction[edge_index].astype(dtype) if nonzero else 1)
+        winding = np.cumsum(delta[:, :columns], axis=1, dtype=dtype)
+        inside = (winding != 0) if nonzero else (winding & 1).view(bool)
+        hits = inside.view(np.uint8).reshape(y1 - y0, ss, x1 - x0, ss).sum(axis=(1, 3), dtype=np.uint8)
+        return hits * np.float32(1 / (ss * ss))
+
+    def box(self, edges):
+        """Pixel box [x0, x1) x [y0, y1) the edges reach, clipped to the canvas, or None"""
+        xs, ys = edges[:, 0::2], edges[:, 1::2]
+        x0 = max(0, int(math.floor(xs.min())))
+        y0 = max(0, int(math.floor(ys.min())))
+        x1 = min(self.width, int(math.ceil(xs.max())) + 1)
+        y1 = min(self.height, int(math.ceil(ys.max())) + 1)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+
+    def paint(self, edges, paint, nonzero=False):
+        """Composite a solid color or gradient over the area inside the outline edges"""
+        if not len(edges):
+            return
+        box = self.box(edges)
+        if box is None:
+            return
+        x0, y0, x1, y1 = box
+        coverage = self.coverage(edges, x0, y0, x1, y1, nonzero)
+        if not coverage.any():
+            return
+
+        source = paint(x0, y0, x1, y1) * coverage[:, :, None]
+        target = self.pixels[y0:y1, x0:x1]
+        target *= 1 - source[:, :, 3:4]
+        target += source
+
+    def composite(self, source):
+        """Draw a full-size premultiplied RGBA layer over the canvas"""
+        self.pixels *= 1 - source[:, :, 3:4]
+        self.pixels += source
+
+
+def premultiplied(rgba):
+    r, g, b, a = (c / 255 for c in rgba)
+    return np.array([r * a, g * a, b * a, a], dtype=np.float32)
+
+
+def solid(rgba):
+    color = premultiplied(rgba)
+    return lambda x0, y0, x1, y1: np.broadcast_to(color, (y1 - y0, x1 - x0, 4))
+
+
+def gradient_table(stops):
+    """Premultiplied colors at GRADIENT_TABLE_SIZE evenly spaced positions"""
+    positions = np.array([pos for pos, _ in stops], dtype=float)
+    colors = np.array([premultiplied(color) for _, color in stops])
+    t = np.linspace(0, 1, GRADIENT_TABLE_SIZE)
+    return np.column_stack([np.interp(t, positions, colors[:, c]) for c in range(4)]).astype(np.float32)
+
+
+def gradient_paint(gradient, transform):
+    """Paint function for a scene Gradient whose coordinates are in the frame transform maps to the device"""
+    table = gradient_table(gradient.stops)
+    to_gradient = inverse(transform)
+
+    def paint(x0, y0, x1, y1):
+        ys, xs = np.mgrid[y0:y1, x0:x1]
+        centers = np.column_stack((xs.ravel() + 0.5, ys.ravel() + 0.5))
+        gx, gy = transform_points(to_gradient, centers).T
+
+        if gradient.kind == "Linear":
+            ax, ay, bx, by = gradient.coords
+            dx, dy = bx - ax, by - ay
+            t = ((gx - ax) * dx + (gy - ay) * dy) / max(dx * dx + dy * dy, 1e-12)
+            t = np.clip(t, 0, 1)
+        elif gradient.kind == "Radial":
+            cx, cy, radius = gradient.coords
+            t = np.clip(np.hypot(gx - cx, gy - cy) / max(radius, 1e-12), 0, 1)
+        else:  # Conical: counter-clockwise on screen from the start angle
+            cx, cy, angle = gradient.coords
+            theta = np.arctan2(-(gy - cy), gx - cx) - math.radians(angle)
+            t = (theta / (2 * math.pi)) % 1.0
+
+        index = np.rint(t * (GRADIENT_TABLE_SIZE - 1)).astype(np.int64)
+        return table[index].reshape(y1 - y0, x1 - x0, 4)
+
+    return paint
+
+
+class NumpyRenderer:
+    """Qt-free renderer with the same render API as ArtRenderer, returning a RasterImage
+
+    Text shapes are skipped: without a font engine there are no glyph outlines to fill.
+    """
+
+    def render(self, settings, cancelled=None, stats=None):
+        """Render the abstract art for the given settings and return a RasterImage
+
+        A per-stage time report goes into the stats dict under "profile" if given.
+        """
+        profiler = Profiler() if stats is not None else NULL_PROFILER
+        generator = SceneGenerator(settings, profiler)
+        shapes = generator.generate_dense() if settings.dense_enabled else generator.generate_shapes()
+        image = self.rasterize_layers(settings.width, settings.height, generator.generate_background(),
+                                      shapes, generator.generate_texture(), cancelled, profiler)
+        if stats is not None:
+            stats["profile"] = profiler.report()
+        return image
+
+    def render_preview(self, settings, scale=0.25, cancelled=None):
+        """Quick draft of the same scene at reduced size, without gradients or texture"""
+        width = max(1, int(settings.width * scale))
+        height = max(1, int(settings.height * scale))
+        generator = SceneGenerator(settings)
+        base = scaling(width / settings.width, height / settings.height)
+        canvas = Canvas(width, height)
+        self.paint_background(canvas, generator.generate_background(), settings.width, settings.height, base,
+                              flat=True)
+        if settings.dense_enabled:
+            canvas.composite(splat(generator.generate_dense(), width, height, scale=width / settings.width,
+                                   step=DRAFT_STEP, cancelled=cancelled))
+        else:
+            self.paint_shapes(canvas, generator.generate_shapes(), base, cancelled, flat=True)
+        return RasterImage(canvas.pixels)
+
+    def is_cached(self, settings):
+        """Nothing is cached, so every render paints"""
+        return False
+
+    def is_shapes_cached(self, settings):
+        return False
+
+    def rasterize(self, scene, cancelled=None):
+        """Paint a generated scene and return a RasterImage"""
+        return self.rasterize_layers(scene.width, scene.height, scene.background, scene.shapes, scene.texture,
+                                     cancelled)
+
+    def rasterize_layers(self, width, height, background, shapes, texture_spec, cancelled=None,
+                         profiler=NULL_PROFILER):
+        canvas = Canvas(width, height)
+        with profiler.stage("background"):
+            self.paint_background(canvas, background, width, height, IDENTITY)
+        if isinstance(shapes, DenseLayer):
+            with profiler.stage("dense"):
+                canvas.composite(splat(shapes, width, height, cancelled=cancelled))
+        else:
+            with profiler.stage("shapes"):
+                self.paint_shapes(canvas, shapes, IDENTITY, cancelled)
+        if texture_spec is not None:
+            with profiler.stage("texture"):
+                canvas.composite(self.create_texture(width, height, texture_spec))
+        return RasterImage(canvas.pixels)
+
+    def create_texture(self, width, height, texture_spec):
+        """Texture layer as premultiplied RGBA floats"""
+        rng = np.random.default_rng(texture_spec.seed)
+        argb = texture.create_texture(width, height, texture_spec.kind, texture_spec.intensity, rng)
+        return argb32_to_premultiplied(argb)
+
+    def paint_background(self, canvas, background, width, height, base, flat=False):
+        """Paint a background record; flat replaces a gradient with its middle color"""
+        area = polygon_edges([transform_points(base, rect_points(0, 0, width, height))])
+        if background.kind == "Gradient":
+            stops = background.gradient.stops
+            paint = solid(stops[len(stops) // 2][1]) if flat else gradient_paint(background.gradient, base)
+            canvas.paint(area, paint)
+            return
+
+        canvas.paint(area, solid(background.color))
+        if background.kind == "Pattern":
+            scale = transform_scale(base)
+            for x, y, size, color in background.circles:
+                # QPainter's default pen outlines each circle in 1px black
+                self.paint_op(canvas, Op([ellipse_points(x, y, size, size, scale)],
+                                         [(ellipse_points(x, y, size, size, scale), True)]),
+                              base, solid(color), BLACK, 1)
+
+    def paint_shapes(self, canvas, shapes, base, cancelled=None, flat=False):
+        for shape in shapes:
+            if cancelled is not None and cancelled():
+                raise RenderCancelled()
+            self.draw_shape(canvas, shape, base, flat)
+
+    def draw_shape(self, canvas, shape, base, flat=False):
+        """Paint one shape record with its fill, stroke and symmetry copies"""
+        for transform in shape.transforms or (None,):
+            device = base if transform is None else combine(transform, base)
+            scale = transform_scale(device)
+            for op in self.shape_ops(shape.kind, shape.geometry, scale):
+                frame = combine(op.transform, device)
+                if shape.gradient is not None and not flat:
+                    fill = gradient_paint(shape.gradient, frame)
+                else:
+                    fill = solid(shape.color)
+                self.paint_op(canvas, op, frame, fill, shape.stroke, shape.stroke_width)
+
+    def paint_op(self, canvas, op, frame, fill, stroke, stroke_width):
+        """Fill then stroke one draw call, like QPainter does"""
+        if op.fill:
+            canvas.paint(polygon_edges([transform_points(frame, p) for p in op.fill]), fill)
+        if op.strokes and stroke is not None and stroke_width > 0:
+            edges = [polygon_edges(transform_points(frame, batch))
+                     for points, closed in op.strokes for batch in stroke_polygons(points, closed, stroke_width)]
+            if edges:
+                canvas.paint(np.concatenate(edges), solid(stroke), nonzero=True)
+
+    def shape_ops(self, kind, g, scale):
+        """Draw calls that paint a shape, in its local coordinates"""
+        if kind == "rotated_rect":
+            w, h = g["w"], g["h"]
+            rect = rect_points(int(-w / 2), int(-h / 2), int(w), int(h))
+            local = combine(rotation(g["angle"]), translation(g["x"] + w / 2, g["y"] + h / 2))
+            return [Op([rect], [(rect, True)], local)]
+        elif kind == "ellipse":
+            outline = ellipse_points(g["x"], g["y"], g["w"], g["h"], scale)
+            return [Op([outline], [(outline, True)])]
+        elif kind == "polygon":
+            outline = geometry.polygon_vertices(g["points"])
+            return [Op([outline], [(outline, True)])]
+        elif kind == "spiral":
+            # Filled as if closed, stroked open, like QPainter.drawPath
+            outline = geometry.spiral_vertices(g["cx"], g["cy"], g["size"], g["turns"], scale)
+            return [Op([outline], [(outline, False)])]
+        elif kind == "bezier":
+            outline = bezier_points(g["points"], scale)
+            return [Op([outline], [(outline, False)])]
+        elif kind == "star":
+            outline = geometry.star_vertices(g["cx"], g["cy"], g["outer"], g["inner"], g["points"])
+            return [Op([outline], [(outline, True)])]
+        elif kind == "arc":
+            # drawArc only strokes
+            outline = arc_points(g["x"], g["y"], g["w"], g["h"], g["start"], g["span"], scale)
+            return [Op([], [(outline, False)])]
+        elif kind == "donut":
+            outer, inner = g["outer"], g["inner"]
+            rings = [ellipse_points(g["x"], g["y"], outer, outer, scale),
+                     ellipse_points(g["x"] + (outer - inner) / 2, g["y"] + (outer - inner) / 2, inner, inner,
+                                    scale)]
+            return [Op(rings, [(ring, True) for ring in rings])]
+        elif kind == "cross":
+            cx, cy, size, thickness = g["cx"], g["cy"], g["size"], g["thickness"]
+            horizontal = rect_points(cx - size // 2, cy - thickness // 2, size, thickness)
+            vertical = rect_points(cx - thickness // 2, cy - size // 2, thickness, size)
+            return [Op([horizontal], [(horizontal, True)]), Op([vertical], [(vertical, True)])]
+        elif kind == "line":
+            outline = np.array([(g["x1"], g["y1"]), (g["x2"], g["y2"])], dtype=float)
+            return [Op([], [(outline, False)])]
+        elif kind == "text":
+            return []
+        raise ValueError(f"Unknown shape kind: {kind}")
+
+
+def argb32_to_premultiplied(argb):
+    """(height, width) uint32 ARGB32 pixels as premultiplied (height, width, 4) floats"""
+    a = ((argb >> 24) & 0xFF).astype(np.float32) / 255
+    r = ((argb >> 16) & 0xFF).astype(np.float32) / 255
+    g = ((argb >> 8) & 0xFF).astype(np.float32) / 255
+    b = (argb & 0xFF).astype(np.float32) / 255
+    return np.stack((r * a, g * a, b * a, a), axis=-1)
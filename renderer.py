@@ -0,0 +1,512 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+import numpy as np
+from PyQt5.QtGui import (
+    QGuiApplication, QPainter, QColor, QPolygonF, QPainterPath, QBrush, QPen,
+    QLinearGradient, QRadialGradient, QConicalGradient, QImage, QFont, QTransform, QPicture
+)
+from PyQt5.QtCore import Qt, QPointF
+from PyQt5 import sip
+
+from scene import SceneGenerator, RenderCancelled
+from culling import cull_occluded
+from dense import DRAFT_STEP, splat
+from raster import RasterImage
+from profiler import NULL_PROFILER, Profiler
+import geometry
+import texture
+
+
+_app = None
+
+
+def ensure_app():
+    """Make sure a QGuiApplication exists so fonts and images work without a window"""
+    global _app
+    if QGuiApplication.instance() is None:
+        if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        _app = QGuiApplication([])
+    return QGuiApplication.instance()
+
+
+def array_to_qimage(array, fmt=QImage.Format_ARGB32):
+    """Wrap a (height, width) uint32 pixel array as a QImage without copying"""
+    array = np.ascontiguousarray(array, dtype=np.uint32)
+    height, width = array.shape
+    image = QImage(array.data, width, height, width * 4, fmt)
+    # The QImage only borrows the buffer, so keep the array alive with it
+    image._array = array
+    return image
+
+
+def buffer_to_qimage(array, fmt=QImage.Format_ARGB32_Premultiplied):
+    """Writable QImage over a C-contiguous (height, width) uint32 array, so painting lands in the array
+
+    The array may be a block of rows from a larger buffer; keep it alive while the image is used.
+    """
+    height, width = array.shape
+    return QImage(sip.voidptr(array.ctypes.data), width, height, array.strides[0], fmt)
+
+
+def array_to_polygon(vertices):
+    """Copy an (n, 2) vertex array into a QPolygonF in one block instead of one QPointF at a time"""
+    vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+    polygon = QPolygonF()
+    polygon.fill(QPointF(), len(vertices))
+    if len(vertices):
+        # QPolygonF stores its points as consecutive (x, y) doubles
+        buffer = polygon.data()
+        buffer.setsize(vertices.nbytes)
+        np.frombuffer(buffer, np.float64).reshape(-1, 2)[:] = vertices
+    return polygon
+
+
+def device_scale(painter):
+    """How many device pixels one scene unit covers under the painter's current transform"""
+    return abs(painter.worldTransform().determinant()) ** 0.5
+
+
+def qcolor(rgba):
+    """Convert an (r, g, b, a) tuple to a QColor"""
+    return QColor(*rgba)
+
+
+def make_gradient(gradient, stops=None):
+    """Build the Qt gradient for a scene Gradient record, optionally with prebuilt [(pos, QColor)] stops"""
+    if gradient.kind == "Linear":
+        grad = QLinearGradient(*gradient.coords)
+    elif gradient.kind == "Radial":
+        grad = QRadialGradient(*gradient.coords)
+    else:  # Conical
+        grad = QConicalGradient(*gradient.coords)
+
+    if stops is None:
+        stops = [(pos, qcolor(color)) for pos, color in gradient.stops]
+    grad.setStops(stops)
+    return grad
+
+
+NO_PEN = QPen(Qt.NoPen)
+
+# Shape kinds whose draw_ method changes the painter's transform or font
+STATEFUL_KINDS = ("rotated_rect", "text")
+
+
+class LayerCache:
+    """Keeps the most recent images of each render layer, keyed by the settings that affect it
+
+    Safe to share between threads; two threads missing the same key may both build it.
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self.layers = {}
+        self.lock = threading.Lock()
+
+    def get(self, layer, key, build):
+        """Return the cached image for (layer, key), building it on a miss"""
+        with self.lock:
+            entries = self.layers.setdefault(layer, OrderedDict())
+            if key in entries:
+                entries.move_to_end(key)
+                return entries[key]
+
+        # Built outside the lock, as building a layer may look up others
+        image = build()
+        self.put(layer, key, image)
+        return image
+
+    def peek(self, layer, key):
+        """The cached value for (layer, key) or None, without building it"""
+        with self.lock:
+            return self.layers.get(layer, {}).get(key)
+
+    def put(self, layer, key, value):
+        with self.lock:
+            entries = self.layers.setdefault(layer, OrderedDict())
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+
+    def contains(self, layer, key):
+        with self.lock:
+            return key in self.layers.get(layer, ())
+
+    def clear(self):
+        with self.lock:
+            self.layers.clear()
+
+
+class StyleCache:
+    """Pens, brushes and gradient stops shared by every shape with the same style
+
+    Keyed by the plain tuples of the scene records, so shapes from one palette
+    reuse a few dozen objects instead of allocating their own. The least
+    recently used entries are dropped beyond size. Safe to share between threads.
+    """
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        value = build()
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return value
+
+    def brush(self, rgba):
+        return self.get(("brush", rgba), lambda: QBrush(qcolor(rgba)))
+
+    def pen(self, rgba, width):
+        return self.get(("pen", rgba, width), lambda: QPen(qcolor(rgba), width))
+
+    def stops(self, stops):
+        return self.get(("stops", stops), lambda: [(pos, qcolor(color)) for pos, color in stops])
+
+    def gradient_brush(self, gradient):
+        """Brush for a scene Gradient; symmetry copies, previews and tiles repaint the same ones"""
+        key = ("gradient", gradient.kind, gradient.coords, gradient.stops)
+        return self.get(key, lambda: QBrush(make_gradient(gradient, self.stops(gradient.stops))))
+
+
+class ArtRenderer:
+    """Offscreen renderer: generates a scene from RenderSettings and rasterizes it into a QImage"""
+
+    def __init__(self, cache_size=4, result_cache=None, occlusion_culling=False):
+        ensure_app()
+        self.layer_cache = LayerCache(cache_size)
+        self.styles = StyleCache()
+        # Optional RenderCache of finished images; a hit skips painting entirely
+        self.result_cache = result_cache
+        # Skip shapes that later opaque shapes cover completely; the output is unchanged
+        self.occlusion_culling = occlusion_culling
+
+    def scene_background(self, settings):
+        """Generated background record, shared by preview and full renders"""
+        return self.layer_cache.get("background_record", settings.layer_key("background"),
+                                    lambda: SceneGenerator(settings).generate_background())
+
+    def scene_shapes(self, settings, profiler=NULL_PROFILER):
+        """Generated shape records, shared by preview and full renders"""
+        if self.occlusion_culling:
+            return self.culled_shapes(settings, profiler)[0]
+        return self.generated_shapes(settings, profiler)
+
+    def generated_shapes(self, settings, profiler=NULL_PROFILER):
+        return self.layer_cache.get("shape_records", settings.layer_key("shapes"),
+                                    lambda: SceneGenerator(settings, profiler).generate_shapes())
+
+    def scene_dense(self, settings):
+        """Generated high-count mode layer, shared by preview and full renders"""
+        return self.layer_cache.get("dense_records", settings.layer_key("shapes"),
+                                    lambda: SceneGenerator(settings).generate_dense())
+
+    def adopt_scene(self, other, settings):
+        """Reuse the scene records another renderer already generated for settings, instead of generating them again"""
+        for layer, part in (("background_record", "background"), ("shape_records", "shapes"),
+                            ("dense_records", "shapes")):
+            key = settings.layer_key(part)
+            records = other.layer_cache.peek(layer, key)
+            if records is not None:
+                self.layer_cache.put(layer, key, records)
+
+    def culled_shapes(self, settings, profiler=NULL_PROFILER):
+        """Shape records left after occlusion culling, and how many copies it skipped"""
+        def cull():
+            shapes = self.generated_shapes(settings, profiler)
+            with profiler.stage("culling"):
+                return cull_occluded(self, shapes, settings.width, settings.height)
+        return self.layer_cache.get("culled_records", settings.layer_key("shapes"), cull)
+
+    def render(self, settings, cancelled=None, stats=None):
+        """Render the abstract art for the given settings and return a QImage
+
+        Counters about the render, such as the shapes culling skipped, go into the stats dict if given,
+        along with a per-stage time report under "profile".
+        """
+        profiler = Profiler() if stats is not None else NULL_PROFILER
+        if self.result_cache is not None:
+            with profiler.stage("result_cache"):
+                image = self.result_cache.get(settings)
+            if image is not None:
+                if stats is not None:
+                    stats["profile"] = profiler.report()
+                return image
+
+        # Background, shapes and texture are cached separately, so a change
+        # only rebuilds the layers whose settings it touches
+        width, height = settings.width, settings.height
+
+        with profiler.stage("background"):
+            background = self.layer_cache.get(
+                "background", settings.layer_key("background"),
+                lambda: self.rasterize_background(self.scene_background(settings), width, height))
+        if settings.dense_enabled:
+            with profiler.stage("dense"):
+                shapes = self.layer_cache.get(
+                    "shapes", settings.layer_key("shapes"),
+                    lambda: self.rasterize_dense(self.scene_dense(settings), width, height, cancelled=cancelled))
+        else:
+            shapes = self.layer_cache.get(
+                "shapes", settings.layer_key("shapes"),
+                lambda: self.rasterize_shapes(self.scene_shapes(settings, profiler), width, height, cancelled,
+                                              profiler))
+        texture_image = None
+        if settings.texture_enabled:
+            with profiler.stage("texture"):
+                texture_image = self.layer_cache.get(
+                    "texture", settings.layer_key("texture"),
+                    lambda: self.create_texture(width, height, SceneGenerator(settings).generate_texture()))
+
+        if stats is not None and self.occlusion_culling and not settings.dense_enabled:
+            stats["culled"] = self.culled_shapes(settings)[1]
+
+        with profiler.stage("composite"):
+            image = self.composite(background, shapes, texture_image)
+        if self.result_cache is not None:
+            with profiler.stage("result_cache"):
+                self.result_cache.put(settings, image)
+        if stats is not None:
+            stats["profile"] = profiler.report()
+        return image
+
+    def is_cached(self, settings):
+        """Whether a finished render for settings is in the result cache"""
+        return self.result_cache is not None and self.result_cache.contains(settings)
+
+    def is_shapes_cached(self, settings):
+        """Whether a full render would reuse already painted shapes"""
+        return self.layer_cache.contains("shapes", settings.layer_key("shapes"))
+
+    def render_preview(self, settings, scale=0.25, cancelled=None):
+        """Quick draft of the same scene at reduced size, without antialiasing, gradients or texture"""
+        width = max(1, int(settings.width * scale))
+        height = max(1, int(settings.height * scale))
+        image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+
+        painter = QPainter(image)
+        # Same scene coordinates as the full render, just scaled down
+        painter.scale(width / settings.width, height / settings.height)
+        try:
+            self.paint_background(painter, self.scene_background(settings), settings.width, settings.height,
+                                  flat=True)
+            if settings.dense_enabled:
+                painter.resetTransform()
+                painter.drawImage(0, 0, self.rasterize_dense(self.scene_dense(settings), width, height,
+                                                             scale=width / settings.width, step=DRAFT_STEP,
+                                                             cancelled=cancelled))
+                return image
+            state = {}
+            for shape in self.scene_shapes(settings):
+                if cancelled is not None and cancelled():
+                    raise RenderCancelled()
+                self.draw_shape(painter, shape, flat=True, state=state)
+        finally:
+            painter.end()
+        return image
+
+    def rasterize(self, scene):
+        """Paint a generated scene and return a QImage"""
+        background = self.rasterize_background(scene.background, scene.width, scene.height)
+        shapes = self.rasterize_shapes(scene.shapes, scene.width, scene.height)
+        texture_image = None
+        if scene.texture is not None:
+            texture_image = self.create_texture(scene.width, scene.height, scene.texture)
+        return self.composite(background, shapes, texture_image)
+
+    def composite(self, background, shapes, texture_image=None):
+        """Stack the layers into a new image, leaving the cached layers untouched"""
+        image = background.copy()
+        painter = QPainter(image)
+        painter.drawImage(0, 0, shapes)
+        if texture_image is not None:
+            painter.drawImage(0, 0, texture_image)
+        painter.end()
+        return image
+
+    def rasterize_shapes(self, shapes, width, height, cancelled=None, profiler=NULL_PROFILER):
+        """Paint shape records onto a transparent layer, stopping early once cancelled() is True"""
+        image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        try:
+            state = {}
+            for shape in shapes:
+                if cancelled is not None and cancelled():
+                    raise RenderCancelled()
+                self.draw_shape(painter, shape, state=state, profiler=profiler)
+        finally:
+            painter.end()
+        return image
+
+    def rasterize_dense(self, layer, width, height, scale=1.0, step=1, cancelled=None):
+        """Paint a high-count mode layer onto a transparent layer with the vectorized splatter"""
+        pixels = splat(layer, width, height, scale, step, cancelled)
+        return array_to_qimage(RasterImage(pixels).to_argb32(), QImage.Format_ARGB32_Premultiplied)
+
+    def create_texture(self, width, height, texture_spec):
+        """Create a texture image"""
+        rng = np.random.default_rng(texture_spec.seed)
+        return array_to_qimage(texture.create_texture(width, height, texture_spec.kind,
+                                                      texture_spec.intensity, rng))
+
+    def rasterize_background(self, background, width, height):
+        """Paint the background layer"""
+        image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        painter = QPainter(image)
+        self.paint_background(painter, background, width, height)
+        painter.end()
+        return image
+
+    def paint_background(self, painter, background, width, height, flat=False):
+        """Paint a background record; flat replaces a gradient with its middle color"""
+        if background.kind == "Gradient":
+            if flat:
+                stops = background.gradient.stops
+                painter.fillRect(0, 0, width, height, qcolor(stops[len(stops) // 2][1]))
+            else:
+                painter.fillRect(0, 0, width, height, make_gradient(background.gradient))
+            return
+
+        painter.fillRect(0, 0, width, height, qcolor(background.color))
+        if background.kind == "Pattern":
+            for x, y, size, color in background.circles:
+                painter.setBrush(qcolor(color))
+                painter.drawEllipse(x, y, size, size)
+
+    def draw_shape(self, painter, shape, flat=False, state=None, profiler=NULL_PROFILER):
+        """Paint one shape record with its fill, stroke and symmetry transform
+
+        Callers painting a run of shapes pass the same state dict to every call and leave
+        the painter's brush and pen alone in between; they are then only set on a change.
+        """
+        if shape.gradient is not None and not flat:
+            with profiler.stage("draw/gradients"):
+                brush = self.styles.gradient_brush(shape.gradient)
+        else:
+            brush = self.styles.brush(shape.color)
+        pen = self.styles.pen(shape.stroke, shape.stroke_width) if shape.stroke is not None else NO_PEN
+
+        if state is None:
+            state = {}
+        if state.get("brush") is not brush:
+            painter.setBrush(brush)
+            state["brush"] = brush
+        if state.get("pen") is not pen:
+            painter.setPen(pen)
+            state["pen"] = pen
+
+        draw = getattr(self, f"draw_{shape.kind}")
+        if shape.kind == "spiral":
+            # Curves are flattened to a vertex count that follows their size on screen
+            draw = partial(draw, scale=device_scale(painter))
+
+        with profiler.stage(f"draw/{shape.kind}"):
+            if shape.transforms is None:
+                if shape.kind not in STATEFUL_KINDS:
+                    draw(painter, shape.geometry)
+                    return
+                painter.save()
+                draw(painter, shape.geometry)
+                painter.restore()
+                return
+
+            # Record the geometry once and replay the recording for every symmetry copy
+            picture = QPicture()
+            recorder = QPainter(picture)
+            recorder.setRenderHints(painter.renderHints())
+            recorder.setBrush(painter.brush())
+            recorder.setPen(painter.pen())
+            draw(recorder, shape.geometry)
+            recorder.end()
+
+        with profiler.stage("draw/symmetry"):
+            for transform in shape.transforms:
+                painter.save()
+                if transform is not None:
+                    painter.setTransform(QTransform(*transform), True)
+                painter.drawPicture(0, 0, picture)
+                painter.restore()
+
+    def draw_rotated_rect(self, painter, g):
+        """Draw a rotated rectangle"""
+        w, h = g["w"], g["h"]
+        painter.translate(g["x"] + w / 2, g["y"] + h / 2)
+        painter.rotate(g["angle"])
+        painter.drawRect(int(-w / 2), int(-h / 2), int(w), int(h))
+
+    def draw_ellipse(self, painter, g):
+        """Draw an ellipse"""
+        painter.drawEllipse(g["x"], g["y"], g["w"], g["h"])
+
+    def draw_polygon(self, painter, g):
+        """Draw a polygon"""
+        painter.drawPolygon(array_to_polygon(geometry.polygon_vertices(g["points"])))
+
+    def draw_spiral(self, painter, g, scale=1.0):
+        """Draw a spiral"""
+        painter.drawPath(self.generate_spiral(QPointF(g["cx"], g["cy"]), g["size"], g["turns"], scale))
+
+    def draw_bezier(self, painter, g):
+        """Draw a Bezier curve"""
+        start, ctrl1, ctrl2, end = [QPointF(x, y) for x, y in g["points"]]
+        path = QPainterPath()
+        path.moveTo(start)
+        path.cubicTo(ctrl1, ctrl2, end)
+        painter.drawPath(path)
+
+    def draw_star(self, painter, g):
+        """Draw a star"""
+        vertices = geometry.star_vertices(g["cx"], g["cy"], g["outer"], g["inner"], g["points"])
+        painter.drawPolygon(array_to_polygon(vertices))
+
+    def draw_arc(self, painter, g):
+        """Draw an arc"""
+        painter.drawArc(g["x"], g["y"], g["w"], g["h"], g["start"] * 16, g["span"] * 16)
+
+    def draw_donut(self, painter, g):
+        """Draw a donut shape"""
+        outer, inner = g["outer"], g["inner"]
+        path = QPainterPath()
+        path.addEllipse(g["x"], g["y"], outer, outer)
+        inner_path = QPainterPath()
+        inner_path.addEllipse(g["x"] + (outer - inner) / 2, g["y"] + (outer - inner) / 2, inner, inner)
+        painter.drawPath(path.subtracted(inner_path))
+
+    def draw_cross(self, painter, g):
+        """Draw a cross"""
+        cx, cy, size, thickness = g["cx"], g["cy"], g["size"], g["thickness"]
+        # Horizontal bar
+        painter.drawRect(cx - size // 2, cy - thickness // 2, size, thickness)
+        # Vertical bar
+        painter.drawRect(cx - thickness // 2, cy - size // 2, thickness, size)
+
+    def draw_line(self, painter, g):
+        """Draw a line"""
+        painter.drawLine(QPointF(g["x1"], g["y1"]), QPointF(g["x2"], g["y2"]))
+
+    def draw_text(self, painter, g):
+        """Draw text as a shape"""
+        painter.setFont(QFont("Arial", g["size"]))
+        painter.drawText(g["x"], g["y"], g["text"])
+
+    def generate_spiral(self, center, size, turns, scale=1.0):
+        """Generate a spiral path"""
+        path = QPainterPath()
+        # An open polyline from the center outwards
+        path.addPolygon(array_to_polygon(geometry.spiral_vertices(center.x(), center.y(), size, turns, scale)))
+        return path
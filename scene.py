@@ -0,0 +1,778 @@
+import json
+import math
+import colorsys
+from dataclasses import dataclass, field, asdict
+
+import numpy as np
+
+from profiler import NULL_PROFILER
+
+
+GRADIENT_TYPES = ("Linear", "Radial", "Conical")
+
+TEXT_OPTIONS = ["A", "B", "C", "1", "2", "3", "!", "@", "#", "&", "*", "X", "Y", "Z"]
+
+# Top-level random streams derived from the seed
+STREAM_BACKGROUND = 0
+STREAM_PALETTE = 1
+STREAM_SHAPES = 2
+STREAM_TEXTURE = 3
+STREAM_DENSE = 4
+STREAM_GRADIENT_POOL = 5
+
+# Shape parameters come from one stream per group, with a fixed number of uniforms per shape,
+# so changing one group's settings does not reshuffle the others
+GROUP_STYLE = 0
+GROUP_GEOMETRY = 1
+GROUP_GRADIENT = 2
+
+# Columns of the style group
+U_COLOR = 0
+U_ALPHA = 1
+U_KIND = 2
+U_STROKE = 3  # three columns for a random stroke color
+STYLE_DRAWS = 6
+
+# Gradient type plus up to four coordinates, followed by the pick from the stop pool
+GRADIENT_HEADER = 5
+GRADIENT_DRAWS = GRADIENT_HEADER + 1
+
+# Most polygon vertices, the top of the GUI's detail slider
+MAX_DETAIL = 20
+# Enough for a Bezier curve or a polygon of MAX_DETAIL radii, whatever the detail setting,
+# so changing it does not shift the geometry of every shape
+GEOMETRY_DRAWS = max(9, 2 + MAX_DETAIL)
+
+# Jittered stop sets drawn per palette color; shapes pick one, so their gradients share stops
+GRADIENT_POOL = 8
+
+# High-count mode: one record per primitive; style indexes DenseLayer.styles, angle is a direction index
+DENSE_DTYPE = np.dtype([("x", np.float32), ("y", np.float32), ("size", np.uint8), ("angle", np.uint8),
+                        ("style", np.uint16)])
+# Alpha values a palette color is quantized to, so primitives share few styles
+DENSE_ALPHA_LEVELS = 4
+DENSE_DIRECTIONS = 8
+# Primitives are painted in this many rounds, each grouped by style, so no color ends up always on top
+DENSE_ROUNDS = 8
+# Primitives sampled per block, to bound the memory of the uniforms
+DENSE_BLOCK = 1 << 20
+
+
+def randint_array(u, lo, hi):
+    """Integers in [lo, hi] from uniforms, like random.randint applied elementwise"""
+    lo, hi = np.asarray(lo), np.asarray(hi)
+    if np.any(hi < lo):
+        raise ValueError(f"empty range for randint({np.min(lo)}, {np.min(hi)})")
+    return lo + np.floor(u * (hi - lo + 1)).astype(np.int64)
+
+
+def choice_array(u, count):
+    """Indices into a sequence of count items from uniforms"""
+    return np.minimum((u * count).astype(np.int64), count - 1)
+
+
+def geometry_rows(**columns):
+    """Turn equal-length geometry columns into one dict of Python numbers per shape"""
+    names = list(columns)
+    values = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def hex_to_rgba(color, alpha=255):
+    """Convert "#RRGGBB" to an (r, g, b, a) tuple"""
+    color = color.lstrip("#")
+    return (int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16), alpha)
+
+
+def hsv_to_rgba(h, s, v, a=1.0):
+    """Convert HSV floats (0.0-1.0) to an (r, g, b, a) tuple of ints"""
+    r, g, b = colorsys.hsv_to_rgb(h, s, v)
+    return (round(r * 255), round(g * 255), round(b * 255), round(a * 255))
+
+
+def rgba_to_hsv(color):
+    """Convert an (r, g, b, a) tuple to HSV floats plus alpha"""
+    r, g, b, a = color
+    h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+    return h, s, v, a / 255
+
+
+def rgb_to_hsv_array(rgb):
+    """colorsys.rgb_to_hsv for an (..., 3) array of floats (0.0-1.0), returning h, s, v arrays"""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    delta = maxc - minc
+    gray = delta == 0
+    safe = np.where(gray, 1.0, delta)
+
+    s = np.where(maxc > 0, delta / np.where(maxc > 0, maxc, 1.0), 0.0)
+    rc, gc, bc = (maxc - r) / safe, (maxc - g) / safe, (maxc - b) / safe
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(gray, 0.0, (h / 6.0) % 1.0)
+    return h, s, maxc
+
+
+def hsv_to_rgb_array(h, s, v):
+    """colorsys.hsv_to_rgb for arrays, returning an (..., 3) array of floats (0.0-1.0)"""
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(np.int64) % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=-1)
+
+
+class RenderCancelled(Exception):
+    """Raised inside a render when its cancel check reports the result is no longer wanted"""
+
+
+class RandomStream:
+    """random.Random style draws from one independent numpy Generator of the seed's SeedSequence tree"""
+
+    def __init__(self, seed, *key):
+        self.generator = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+    # Scalar draws scale generator.random(), which costs a third of generator.integers() per call
+
+    def randint(self, a, b):
+        """Integer in [a, b], both ends included"""
+        return a + int(self.generator.random() * (b - a + 1))
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.generator.random()
+
+    def choice(self, items):
+        return items[int(self.generator.random() * len(items))]
+
+    def getrandbits(self, bits):
+        return int.from_bytes(self.generator.bytes((bits + 7) // 8), "little") >> (-bits % 8)
+
+
+@dataclass
+class Gradient:
+    """Gradient fill: kind is Linear, Radial or Conical"""
+    kind: str
+    # Linear: (x1, y1, x2, y2); Radial: (cx, cy, radius); Conical: (cx, cy, angle)
+    coords: tuple
+    # ((position, (r, g, b, a)), ...)
+    stops: tuple
+
+
+@dataclass
+class Shape:
+    """One painted shape instance"""
+    kind: str
+    geometry: dict
+    color: tuple
+    gradient: Gradient = None
+    stroke: tuple = None
+    stroke_width: float = 0
+    # Symmetry copies: one affine (m11, m12, m21, m22, dx, dy) per copy, None for the untransformed one.
+    # The geometry is generated once and every copy replays it, so the copies are identical.
+    transforms: tuple = None
+
+
+@dataclass
+class Background:
+    """Background layer: a flat color, a gradient, or a pattern of translucent circles"""
+    kind: str
+    color: tuple = (255, 255, 255, 255)
+    gradient: Gradient = None
+    # ((x, y, size, (r, g, b, a)), ...)
+    circles: tuple = ()
+
+
+@dataclass
+class Texture:
+    """Texture overlay parameters; the pixels are regenerated from the seed"""
+    kind: str
+    intensity: int
+    seed: int
+
+
+@dataclass
+class DenseLayer:
+    """High-count mode shape layer: millions of small primitives in a DENSE_DTYPE array
+
+    The records are ordered by round, then by style, so each run of equal (round, style)
+    can be painted in one batch.
+    """
+    kind: str
+    # ((r, g, b, a), ...)
+    styles: tuple
+    points: np.ndarray
+    rounds: np.ndarray
+
+    def groups(self):
+        """(style, records) for every batch, in painting order"""
+        keys = self.rounds.astype(np.int64) * len(self.styles) + self.points["style"]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        starts = np.concatenate(([0], bounds)) if len(keys) else np.array([], dtype=np.int64)
+        stops = np.concatenate((bounds, [len(keys)]))
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            yield int(self.points["style"][start]), self.points[start:stop]
+
+
+@dataclass
+class Scene:
+    """Resolution independent description of a render"""
+    width: int
+    height: int
+    background: Background
+    shapes: list = field(default_factory=list)
+    texture: Texture = None
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        def gradient(value):
+            if value is None:
+                return None
+            return Gradient(value["kind"], tuple(value["coords"]),
+                            tuple((pos, tuple(color)) for pos, color in value["stops"]))
+
+        def geometry(value):
+            # JSON turns point tuples into lists
+            if isinstance(value.get("points"), list):
+                value = dict(value, points=[tuple(point) for point in value["points"]])
+            return value
+
+        bg = data["background"]
+        background = Background(bg["kind"], tuple(bg["color"]), gradient(bg["gradient"]),
+                                tuple((x, y, size, tuple(color)) for x, y, size, color in bg["circles"]))
+
+        def transforms(value):
+            if value is None:
+                return None
+            return tuple(tuple(t) if t is not None else None for t in value)
+
+        shapes = [
+            Shape(s["kind"], geometry(s["geometry"]), tuple(s["color"]), gradient(s["gradient"]),
+                  tuple(s["stroke"]) if s["stroke"] is not None else None, s["stroke_width"],
+                  transforms(s["transforms"]))
+            for s in data["shapes"]
+        ]
+        texture = Texture(**data["texture"]) if data["texture"] is not None else None
+        return cls(data["width"], data["height"], background, shapes, texture)
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+class SceneGenerator:
+    """Generate phase: turns RenderSettings into a Scene without painting anything"""
+
+    def __init__(self, settings, profiler=NULL_PROFILER):
+        self.settings = settings
+        # Times the colors, gradients and geometry sampling of the shapes
+        self.profiler = profiler
+        self.canvas_width = settings.width
+        self.canvas_height = settings.height
+        # Background, palette, texture and shapes draw from their own streams, so each can be
+        # generated on its own; see shape_uniforms for how shapes share theirs
+        self.background_random = RandomStream(settings.seed, STREAM_BACKGROUND)
+        self.palette_random = RandomStream(settings.seed, STREAM_PALETTE)
+        self.texture_random = RandomStream(settings.seed, STREAM_TEXTURE)
+
+    def generate(self):
+        """Generate the full scene for the settings"""
+        return Scene(self.canvas_width, self.canvas_height, self.generate_background(),
+                     self.generate_shapes(), self.generate_texture())
+
+    def generate_texture(self):
+        """Generate the texture layer parameters, or None when texture is off"""
+        settings = self.settings
+        if not settings.texture_enabled:
+            return None
+        return Texture(settings.texture_type, settings.texture_intensity, self.texture_random.getrandbits(64))
+
+    def generate_dense(self):
+        """Sample the high-count mode layer: positions, sizes, directions and shared styles"""
+        settings = self.settings
+        palette = np.array(self.palette(), dtype=np.int64).reshape(-1, 4)
+        if settings.alpha_enabled:
+            alphas = np.linspace(settings.min_alpha, settings.max_alpha, DENSE_ALPHA_LEVELS).round().astype(int)
+        else:
+            alphas = np.array([255])
+        styles = tuple((r, g, b, a) for r, g, b, _ in palette.tolist() for a in alphas.tolist())
+
+        count = settings.dense_count
+        points = np.empty(count, dtype=DENSE_DTYPE)
+        generator = np.random.default_rng(np.random.SeedSequence(settings.seed, spawn_key=(STREAM_DENSE,)))
+        for start in range(0, count, DENSE_BLOCK):
+            stop = min(count, start + DENSE_BLOCK)
+            u = generator.random((stop - start, 6))
+            block = points[start:stop]
+            block["x"] = u[:, 0] * self.canvas_width
+            block["y"] = u[:, 1] * self.canvas_height
+            block["size"] = randint_array(u[:, 2], 1, settings.dense_size)
+            block["angle"] = choice_array(u[:, 3], DENSE_DIRECTIONS)
+            block["style"] = (choice_array(u[:, 4], len(palette)) * len(alphas)
+                              + choice_array(u[:, 5], len(alphas)))
+
+        rounds = (np.arange(count, dtype=np.int64) * DENSE_ROUNDS // max(count, 1)).astype(np.uint8)
+        order = np.argsort(rounds.astype(np.int64) * len(styles) + points["style"], kind="stable")
+        return DenseLayer(settings.dense_kind, styles, points[order], rounds[order])
+
+    def generate_random_color(self, alpha=255, rnd=None):
+        """Generate a random color"""
+        rnd = rnd or self.palette_random
+        return (rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255), alpha)
+
+    def generate_harmony_colors(self, base_hue, harmony_type):
+        """Generate a color harmony based on the selected type"""
+        saturation = self.settings.saturation / 100.0
+        value = self.settings.value / 100.0
+
+        def hue(offset):
+            return hsv_to_rgba(((base_hue + offset) % 360) / 360, saturation, value)
+
+        if harmony_type == "Complementary":
+            return [hue(0), hue(180)]
+        elif harmony_type == "Analogous":
+            return [hue(-30), hue(0), hue(30)]
+        elif harmony_type == "Triadic":
+            return [hue(0), hue(120), hue(240)]
+        elif harmony_type == "Tetradic":
+            return [hue(0), hue(60), hue(180), hue(240)]
+        elif harmony_type == "Monochromatic":
+            return [
+                hsv_to_rgba(base_hue / 360, max(0.2, saturation * 0.7), min(1.0, value * 1.2)),
+                hue(0),
+                hsv_to_rgba(base_hue / 360, min(1.0, saturation * 1.2), max(0.2, value * 0.7))
+            ]
+        else:  # Random
+            return [self.generate_random_color() for _ in range(4)]
+
+    def palette(self):
+        """Get selected colors or generate a harmony"""
+        settings = self.settings
+        selected_colors = [hex_to_rgba(color) for color in settings.picked_colors()]
+
+        if not selected_colors:
+            selected_colors = self.generate_harmony_colors(settings.hue, settings.harmony)
+
+        return selected_colors
+
+    def generate_background(self):
+        """Generate the background layer"""
+        bg_type = self.settings.bg_type
+        rnd = self.background_random
+        if bg_type == "Random":
+            return Background("Solid", self.generate_random_color(rnd=rnd))
+        elif bg_type == "Solid":
+            return Background("Solid", hex_to_rgba(self.settings.bg_color))
+        elif bg_type == "Gradient":
+            gradient = self.random_gradient(self.generate_random_color(rnd=rnd),
+                                            self.canvas_width, self.canvas_height, rnd=rnd)
+            return Background("Gradient", gradient=gradient)
+        else:  # Pattern
+            circles = []
+            for _ in range(100):
+                color = self.generate_random_color(alpha=50, rnd=rnd)
+                size = rnd.randint(10, 100)
+                x = rnd.randint(0, self.canvas_width)
+                y = rnd.randint(0, self.canvas_height)
+                circles.append((x, y, size, color))
+            return Background("Pattern", (255, 255, 255, 255), circles=tuple(circles))
+
+    def random_gradient(self, base_color, width, height, rnd):
+        """Create a random gradient"""
+        gradient_type = self.settings.gradient_type
+        if gradient_type == "Random":
+            gradient_type = rnd.choice(list(GRADIENT_TYPES))
+
+        if gradient_type == "Linear":
+            coords = (rnd.randint(0, width), rnd.randint(0, height), rnd.randint(0, width), rnd.randint(0, height))
+        elif gradient_type == "Radial":
+            cx = rnd.randint(0, width)
+            cy = rnd.randint(0, height)
+            radius = rnd.randint(50, min(width, height) // 2)
+            coords = (cx, cy, radius)
+        else:  # Conical
+            cx = rnd.randint(0, width)
+            cy = rnd.randint(0, height)
+            angle = rnd.randint(0, 360)
+            coords = (cx, cy, angle)
+
+        # Add color stops
+        stops = self.settings.gradient_complexity + 1
+        color_stops = []
+        for i in range(stops):
+            pos = i / (stops - 1) if stops > 1 else 0.5
+            # Create a variation of the base color
+            h, s, v, a = rgba_to_hsv(base_color)
+            h = (h + rnd.uniform(-0.1, 0.1)) % 1.0
+            s = min(1.0, max(0.0, s + rnd.uniform(-0.2, 0.2)))
+            v = min(1.0, max(0.0, v + rnd.uniform(-0.2, 0.2)))
+            color_stops.append((pos, hsv_to_rgba(h, s, v, a)))
+
+        return Gradient(gradient_type, coords, tuple(color_stops))
+
+    def stroke_colors(self, colors, u):
+        """Stroke color of every shape, based on the selected option"""
+        stroke_type = self.settings.stroke_color
+        strokes = np.empty_like(colors)
+        strokes[:, 3] = 255
+
+        if stroke_type in ("Contrast", "Complementary"):
+            # Shapes share a handful of palette colors: work each one out once and look it up
+            rgb, inverse = np.unique(colors[:, :3], axis=0, return_inverse=True)
+            strokes[:, :3] = self.stroke_rgb(rgb, stroke_type)[inverse.reshape(-1)]
+
+        elif stroke_type == "Random":
+            strokes[:, :3] = randint_array(u, 0, 255)
+
+        elif stroke_type == "Black":
+            strokes[:, :3] = 0
+
+        else:  # White
+            strokes[:, :3] = 255
+        return strokes
+
+    def stroke_rgb(self, rgb, stroke_type):
+        """(n, 3) stroke colors derived from (n, 3) fill colors"""
+        if stroke_type == "Contrast":
+            # Black or white based on color brightness
+            brightness = rgb[:, 0] * 0.299 + rgb[:, 1] * 0.587 + rgb[:, 2] * 0.114
+            return np.repeat(np.where(brightness > 128, 0, 255)[:, None], 3, axis=1)
+        # Complementary
+        h, s, v = rgb_to_hsv_array(rgb / 255)
+        return np.rint(hsv_to_rgb_array((h + 0.5) % 1.0, s, v) * 255).astype(np.int64)
+
+    def gradient_pool(self, palette):
+        """(len(palette), GRADIENT_POOL, stops, 3) RGB stop colors
+
+        Each palette color's stops vary its hue, saturation and value.
+        """
+        stops = self.settings.gradient_complexity + 1
+        generator = np.random.default_rng(np.random.SeedSequence(self.settings.seed,
+                                                                  spawn_key=(STREAM_GRADIENT_POOL,)))
+        jitter = generator.random((len(palette), GRADIENT_POOL, stops, 3))
+        base_h, base_s, base_v = (c[:, None, None] for c in rgb_to_hsv_array(palette[:, :3] / 255))
+        stop_h = (base_h + jitter[..., 0] * 0.2 - 0.1) % 1.0
+        stop_s = np.clip(base_s + jitter[..., 1] * 0.4 - 0.2, 0.0, 1.0)
+        stop_v = np.clip(base_v + jitter[..., 2] * 0.4 - 0.2, 0.0, 1.0)
+        return np.rint(hsv_to_rgb_array(stop_h, stop_s, stop_v) * 255).astype(np.int64)
+
+    def shape_gradients(self, colors, pools, u):
+        """Random gradient of every shape, with stops picked from the pool of the shape's palette color"""
+        settings = self.settings
+        w, h = self.canvas_width, self.canvas_height
+        n = len(colors)
+
+        if settings.gradient_type == "Random":
+            kinds = np.array(GRADIENT_TYPES)[choice_array(u[:, 0], len(GRADIENT_TYPES))]
+        else:
+            kinds = np.full(n, settings.gradient_type)
+
+        # Linear: (x1, y1, x2, y2); Radial: (cx, cy, radius); Conical: (cx, cy, angle)
+        xs = randint_array(u[:, 1:5:2], 0, w)
+        ys = randint_array(u[:, 2:5:2], 0, h)
+        radius = randint_array(u[:, 3], 50, min(w, h) // 2) if np.any(kinds == "Radial") else None
+        angle = randint_array(u[:, 3], 0, 360)
+
+        stops = settings.gradient_complexity + 1
+        positions = [i / (stops - 1) if stops > 1 else 0.5 for i in range(stops)]
+        stop_rgb = pools[np.arange(n), choice_array(u[:, GRADIENT_HEADER], GRADIENT_POOL)]
+        stop_colors = np.concatenate(
+            [stop_rgb, np.broadcast_to(colors[:, None, 3:4], (n, stops, 1))], axis=2).tolist()
+
+        gradients = []
+        for i, kind in enumerate(kinds.tolist()):
+            if kind == "Linear":
+                coords = (xs[i, 0], ys[i, 0], xs[i, 1], ys[i, 1])
+            elif kind == "Radial":
+                coords = (xs[i, 0], ys[i, 0], radius[i])
+            else:  # Conical
+                coords = (xs[i, 0], ys[i, 0], angle[i])
+            gradients.append(Gradient(kind, tuple(int(c) for c in coords),
+                                      tuple(zip(positions, map(tuple, stop_colors[i])))))
+        return gradients
+
+    def symmetry_transforms(self):
+        """Affine transforms for every copy the symmetry setting draws, or None for a single copy"""
+        symmetry_type = self.settings.symmetry
+        w, h = self.canvas_width, self.canvas_height
+
+        if symmetry_type == "Horizontal":
+            return (None, (-1.0, 0.0, 0.0, 1.0, float(w), 0.0))
+        elif symmetry_type == "Vertical":
+            return (None, (1.0, 0.0, 0.0, -1.0, 0.0, float(h)))
+        elif symmetry_type == "Radial":
+            sections = self.settings.radial_sections
+            transforms = []
+            for i in range(sections):
+                # Rotate about the canvas center
+                angle = math.radians(i * 360 / sections)
+                c, s = math.cos(angle), math.sin(angle)
+                cx, cy = w / 2, h / 2
+                transforms.append((c, s, -s, c, cx - c * cx + s * cy, cy - s * cx - c * cy))
+            return tuple(transforms)
+        return None
+
+    def shape_uniforms(self, group, start, stop, width):
+        """(stop - start, width) uniforms of one parameter group for shapes start to stop
+
+        Shape k always gets row k of the group's stream, whatever the shape count, and
+        jumping the generator ahead makes any range as cheap to reach as the first one.
+        """
+        seed_sequence = np.random.SeedSequence(self.settings.seed, spawn_key=(STREAM_SHAPES, group))
+        bit_generator = np.random.PCG64(seed_sequence)
+        # Each double consumes exactly one 64-bit step of the generator
+        bit_generator.advance(start * width)
+        return np.random.Generator(bit_generator).random((stop - start, width))
+
+    def sample_shapes(self, start=0, stop=None):
+        """Sample every parameter of shapes start to stop at once into NumPy columns
+
+        Returns a dict with the shape kinds, fill colors, stroke colors and gradients
+        (None when disabled) and a geometry dict per shape.
+        """
+        settings = self.settings
+        if stop is None:
+            stop = settings.num_shapes
+        u = self.shape_uniforms(GROUP_STYLE, start, stop, STYLE_DRAWS)
+        n = len(u)
+
+        with self.profiler.stage("scene/colors"):
+            palette = np.array(self.palette(), dtype=np.int64).reshape(-1, 4)
+            palette_index = choice_array(u[:, U_COLOR], len(palette))
+            colors = palette[palette_index]
+            # Set transparency
+            if settings.alpha_enabled:
+                colors[:, 3] = randint_array(u[:, U_ALPHA], settings.min_alpha, settings.max_alpha)
+            else:
+                colors[:, 3] = 255
+            strokes = self.stroke_colors(colors, u[:, U_STROKE:U_STROKE + 3]) if settings.stroke_enabled else None
+
+        enabled_shapes = list(settings.shapes)
+        kinds = np.array(enabled_shapes)[choice_array(u[:, U_KIND], len(enabled_shapes))]
+
+        gradients = None
+        if settings.gradient_enabled:
+            with self.profiler.stage("scene/gradients"):
+                gradient_u = self.shape_uniforms(GROUP_GRADIENT, start, stop, GRADIENT_DRAWS)
+                gradients = self.shape_gradients(colors, self.gradient_pool(palette)[palette_index], gradient_u)
+
+        geometries = [None] * n
+        with self.profiler.stage("scene/geometry"):
+            geometry_u = self.shape_uniforms(GROUP_GEOMETRY, start, stop, GEOMETRY_DRAWS)
+            for kind in np.unique(kinds).tolist():
+                rows = np.flatnonzero(kinds == kind)
+                for row, geometry in zip(rows.tolist(), getattr(self, f"geometry_{kind}")(geometry_u[rows])):
+                    geometries[row] = geometry
+
+        return {"kinds": kinds, "colors": colors, "strokes": strokes, "gradients": gradients,
+                "geometries": geometries}
+
+    def generate_shapes(self, start=0, stop=None):
+        """Generate the shape layer records, or just shapes start to stop for partial or parallel work"""
+        columns = self.sample_shapes(start, stop)
+        transforms = self.symmetry_transforms()
+        default_width = self.settings.stroke_width
+
+        colors = [tuple(c) for c in columns["colors"].tolist()]
+        strokes = columns["strokes"]
+        strokes = [tuple(c) for c in strokes.tolist()] if strokes is not None else [None] * len(colors)
+        gradients = columns["gradients"] or [None] * len(colors)
+
+        shapes = []
+        for kind, geometry, color, gradient, stroke in zip(columns["kinds"].tolist(), columns["geometries"],
+                                                           colors, gradients, strokes):
+            stroke_width = geometry.pop("pen_width", default_width)
+            shapes.append(Shape(kind, geometry, color, gradient, stroke, stroke_width, transforms))
+        return shapes
+
+    # Geometry samplers take one row of uniforms per shape and return one geometry dict per row
+
+    def geometry_rotated_rect(self, u):
+        """Geometry of rotated rectangles"""
+        s = self.settings
+        w = randint_array(u[:, 0], s.min_size, s.max_size)
+        h = randint_array(u[:, 1], s.min_size, s.max_size)
+        x = randint_array(u[:, 2], 0, self.canvas_width - w)
+        y = randint_array(u[:, 3], 0, self.canvas_height - h)
+        angle = randint_array(u[:, 4], s.min_rotation, s.max_rotation)
+        return geometry_rows(x=x, y=y, w=w, h=h, angle=angle)
+
+    def geometry_ellipse(self, u):
+        """Geometry of ellipses"""
+        s = self.settings
+        w = randint_array(u[:, 0], s.min_size, s.max_size)
+        h = randint_array(u[:, 1], s.min_size, s.max_size)
+        x = randint_array(u[:, 2], 0, self.canvas_width - w)
+        y = randint_array(u[:, 3], 0, self.canvas_height - h)
+        return geometry_rows(x=x, y=y, w=w, h=h)
+
+    def geometry_polygon(self, u):
+        """Geometry of polygons"""
+        s = self.settings
+        detail = s.detail
+        if not 3 <= detail <= MAX_DETAIL:
+            raise ValueError(f"Polygon detail must be between 3 and {MAX_DETAIL}")
+
+        # A center point with a random radius for every vertex
+        cx = randint_array(u[:, 0], 50, self.canvas_width - 50)
+        cy = randint_array(u[:, 1], 50, self.canvas_height - 50)
+        radius = randint_array(u[:, 2:2 + detail], s.min_size // 2, s.max_size // 2)
+        angle = 2 * math.pi * np.arange(detail) / detail
+        xs = cx[:, None] + radius * np.cos(angle)
+        ys = cy[:, None] + radius * np.sin(angle)
+        return [{"points": list(zip(px, py))} for px, py in zip(xs.tolist(), ys.tolist())]
+
+    def geometry_spiral(self, u):
+        """Geometry of spirals"""
+        s = self.settings
+        cx = randint_array(u[:, 0], 100, self.canvas_width - 100)
+        cy = randint_array(u[:, 1], 100, self.canvas_height - 100)
+        size = randint_array(u[:, 2], s.min_size // 2, s.max_size // 2)
+        turns = randint_array(u[:, 3], 3, 8)
+        return geometry_rows(cx=cx, cy=cy, size=size, turns=turns)
+
+    def geometry_bezier(self, u):
+        """Geometry of Bezier curves"""
+        xs = randint_array(u[:, 0:8:2], 0, self.canvas_width)
+        ys = randint_array(u[:, 1:8:2], 0, self.canvas_height)
+        pen_width = randint_array(u[:, 8], 1, 5)
+        return [{"points": list(zip(px, py)), "pen_width": pen}
+                for px, py, pen in zip(xs.tolist(), ys.tolist(), pen_width.tolist())]
+
+    def geometry_star(self, u):
+        """Geometry of stars"""
+        s = self.settings
+        cx = randint_array(u[:, 0], 50, self.canvas_width - 50)
+        cy = randint_array(u[:, 1], 50, self.canvas_height - 50)
+        outer = randint_array(u[:, 2], s.min_size // 2, s.max_size // 2)
+        return geometry_rows(cx=cx, cy=cy, outer=outer, inner=outer * 0.5, points=[s.detail] * len(u))
+
+    def geometry_arc(self, u):
+        """Geometry of arcs"""
+        s = self.settings
+        w = randint_array(u[:, 0], s.min_size, s.max_size)
+        h = randint_array(u[:, 1], s.min_size, s.max_size)
+        x = randint_array(u[:, 2], 0, self.canvas_width - w)
+        y = randint_array(u[:, 3], 0, self.canvas_height - h)
+        start = randint_array(u[:, 4], 0, 360)
+        span = randint_array(u[:, 5], 45, 270)
+        return geometry_rows(x=x, y=y, w=w, h=h, start=start, span=span)
+
+    def geometry_donut(self, u):
+        """Geometry of donut shapes"""
+        s = self.settings
+        cx = randint_array(u[:, 0], 50, self.canvas_width - 50)
+        cy = randint_array(u[:, 1], 50, self.canvas_height - 50)
+        outer = randint_array(u[:, 2], s.min_size // 2, s.max_size // 2)
+        inner = outer * (0.3 + 0.4 * u[:, 3])
+        return geometry_rows(x=cx, y=cy, outer=outer, inner=inner)
+
+    def geometry_cross(self, u):
+        """Geometry of crosses"""
+        s = self.settings
+        cx = randint_array(u[:, 0], 50, self.canvas_width - 50)
+        cy = randint_array(u[:, 1], 50, self.canvas_height - 50)
+        size = randint_array(u[:, 2], s.min_size, s.max_size)
+        thickness = randint_array(u[:, 3], 5, np.maximum(5, size // 3))
+        return geometry_rows(cx=cx, cy=cy, size=size, thickness=thickness)
+
+    def geometry_line(self, u):
+        """Geometry of lines"""
+        s = self.settings
+        x1 = randint_array(u[:, 0], 0, self.canvas_width)
+        y1 = randint_array(u[:, 1], 0, self.canvas_height)
+        length = randint_array(u[:, 2], s.min_size, s.max_size)
+        angle = u[:, 3] * 2 * math.pi
+        pen_width = randint_array(u[:, 4], 1, 5)
+        return geometry_rows(x1=x1, y1=y1, x2=x1 + length * np.cos(angle), y2=y1 + length * np.sin(angle),
+                             pen_width=pen_width)
+
+    def geometry_text(self, u):
+        """Geometry of text shapes"""
+        s = self.settings
+        x = randint_array(u[:, 0], 50, self.canvas_width - 50)
+        y = randint_array(u[:, 1], 50, self.canvas_height - 50)
+        size = randint_array(u[:, 2], s.min_size, s.max_size)
+
+        # Choose text content
+        if s.text_content == "Random":
+            text = np.array(TEXT_OPTIONS)[choice_array(u[:, 3], len(TEXT_OPTIONS))]
+        else:
+            text = [s.text_content] * len(u)
+        return geometry_rows(x=x, y=y, size=size, text=text)
+
+
+def generate_scene(settings):
+    """Generate the scene for a RenderSettings snapshot"""
+    return SceneGenerator(settings).generate()
+
+
+def geometry_bounds(kind, g):
+    """Untransformed (x0, y0, x1, y1) box of a shape's geometry, before stroke"""
+    if kind == "rotated_rect":
+        cx, cy = g["x"] + g["w"] / 2, g["y"] + g["h"] / 2
+        r = math.hypot(g["w"], g["h"]) / 2
+        return cx - r, cy - r, cx + r, cy + r
+    elif kind in ("ellipse", "arc"):
+        return g["x"], g["y"], g["x"] + g["w"], g["y"] + g["h"]
+    elif kind in ("polygon", "bezier"):
+        xs = [x for x, _ in g["points"]]
+        ys = [y for _, y in g["points"]]
+        return min(xs), min(ys), max(xs), max(ys)
+    elif kind == "spiral":
+        # Radius grows from size to twice the size
+        r = g["size"] * 2
+        return g["cx"] - r, g["cy"] - r, g["cx"] + r, g["cy"] + r
+    elif kind == "star":
+        r = g["outer"]
+        return g["cx"] - r, g["cy"] - r, g["cx"] + r, g["cy"] + r
+    elif kind == "donut":
+        return g["x"], g["y"], g["x"] + g["outer"], g["y"] + g["outer"]
+    elif kind == "cross":
+        r = g["size"] / 2 + 1
+        return g["cx"] - r, g["cy"] - r, g["cx"] + r, g["cy"] + r
+    elif kind == "line":
+        return min(g["x1"], g["x2"]), min(g["y1"], g["y2"]), max(g["x1"], g["x2"]), max(g["y1"], g["y2"])
+    elif kind == "text":
+        # Generous box around the baseline; glyph metrics need a font engine
+        size = g["size"] * 96 / 72
+        return g["x"] - size, g["y"] - size * 1.5, g["x"] + size * (len(g["text"]) + 1), g["y"] + size * 0.5
+    raise ValueError(f"Unknown shape kind: {kind}")
+
+
+def shape_copy_bounds(shape):
+    """Canvas-space (x0, y0, x1, y1) box of each symmetry copy, in the order of shape.transforms"""
+    x0, y0, x1, y1 = geometry_bounds(shape.kind, shape.geometry)
+
+    # Stroke reaches half its width outside, more at square caps and miter joins, plus antialiasing
+    margin = (shape.stroke_width if shape.stroke is not None else 0) + 2
+    x0, y0, x1, y1 = x0 - margin, y0 - margin, x1 + margin, y1 + margin
+
+    boxes = []
+    for transform in shape.transforms or (None,):
+        if transform is None:
+            boxes.append((x0, y0, x1, y1))
+            continue
+        m11, m12, m21, m22, dx, dy = transform
+        corners = [(x0, y0), (x1, y0), (x0, y1), (x1, y1)]
+        xs = [m11 * x + m21 * y + dx for x, y in corners]
+        ys = [m12 * x + m22 * y + dy for x, y in corners]
+        boxes.append((min(xs), min(ys), max(xs), max(ys)))
+    return boxes
+
+
+def shape_bounds(shape):
+    """Canvas-space (x0, y0, x1, y1) box that contains everything a shape paints"""
+    boxes = shape_copy_bounds(shape)
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
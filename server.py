@@ -0,0 +1,404 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+from settings import RenderSettings, SHAPES, DENSE_KINDS
+from scene import MAX_DETAIL
+from backends import BACKENDS, create_renderer
+from export import ExportOptions, png_bytes
+
+
+# Largest canvas a request may ask for, so one request cannot exhaust the workers' memory
+MAX_PIXELS = 7680 * 4320
+
+DEFAULT_CACHE_BUDGET = 256 * 1024 * 1024
+
+# Element type of each tuple setting
+TUPLE_ITEM_TYPES = {"colors": str, "selected_colors": int, "shapes": str}
+
+# Inclusive range of each numeric setting a request may use: the GUI's slider ranges,
+# so no single request keeps a worker busy for longer than the GUI could
+SETTING_RANGES = {
+    "seed": (1, 999999),
+    "hue": (0, 360),
+    "saturation": (0, 100),
+    "value": (0, 100),
+    "min_size": (5, 200),
+    "max_size": (10, 500),
+    "min_rotation": (0, 360),
+    "max_rotation": (0, 360),
+    "detail": (3, MAX_DETAIL),
+    "radial_sections": (2, 12),
+    "min_alpha": (50, 255),
+    "max_alpha": (50, 255),
+    "gradient_complexity": (1, 5),
+    "stroke_width": (1, 20),
+    "texture_intensity": (1, 100),
+    "complexity": (10, 500),
+    "density": (1, 100),
+    "chaos": (0, 100),
+    "dense_count": (10000, 5000000),
+    "dense_size": (1, 8),
+}
+
+# Values each string setting accepts, as offered by the GUI
+SETTING_CHOICES = {
+    "harmony": ("Complementary", "Analogous", "Triadic", "Tetradic", "Monochromatic", "Random"),
+    "bg_type": ("Random", "Solid", "Gradient", "Pattern"),
+    "symmetry": ("None", "Horizontal", "Vertical", "Radial"),
+    "gradient_type": ("Linear", "Radial", "Conical", "Random"),
+    "stroke_color": ("Contrast", "Complementary", "Random", "Black", "White"),
+    "texture_type": ("Noise", "Lines", "Dots", "Paper"),
+    "dense_kind": DENSE_KINDS,
+}
+
+MAX_COLORS = 64
+MAX_TEXT_LENGTH = 32
+
+# Per-process renderer set up by init_worker and kept warm between requests
+_renderer = None
+_options = None
+
+
+def init_worker(backend="qt", options=ExportOptions()):
+    """Create the one offscreen renderer this worker process reuses for every request"""
+    global _renderer, _options
+    _renderer = create_renderer(backend)
+    _options = options
+
+
+def render_png(settings):
+    """Render and encode settings in the worker; returns (PNG bytes, render ms, encode ms)"""
+    start = time.perf_counter()
+    image = _renderer.render(settings)
+    rendered = time.perf_counter()
+    data = png_bytes(image, _options)
+    return data, (rendered - start) * 1000, (time.perf_counter() - rendered) * 1000
+
+
+class PNGCache:
+    """Encoded renders keyed by settings, dropping the least recently used beyond a byte budget"""
+
+    def __init__(self, budget=DEFAULT_CACHE_BUDGET):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        data = value[0]
+        if len(data) > self.budget:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = value
+            self.size += len(data)
+            while self.size > self.budget:
+                _, (old, _, _) = self.entries.popitem(last=False)
+                self.size -= len(old)
+
+
+class ServiceUnavailable(Exception):
+    """Raised when the render workers keep dying, even after being restarted"""
+
+
+class RenderService:
+    """Renders settings to PNG on a pool of warm worker processes
+
+    Identical requests that arrive while one is rendering wait for that render
+    instead of starting their own, and finished PNGs are served from a cache.
+    """
+
+    def __init__(self, workers=None, backend="qt", cache_budget=DEFAULT_CACHE_BUDGET, options=ExportOptions()):
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.options = options
+        self.executor = self.start_workers()
+        # Counts worker pools, so a broken one is replaced only once
+        self.generation = 0
+        self.cache = PNGCache(cache_budget)
+        # settings -> (future, generation of the pool rendering it)
+        self.pending = {}
+        # Reentrant, as a render finishing right away runs its done callback inside render()
+        self.lock = threading.RLock()
+
+    def start_workers(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                   initargs=(self.backend, self.options))
+
+    def warm_up(self):
+        """Start every worker and let it render once, so no request pays for interpreter or Qt startup"""
+        for future in [self.executor.submit(render_png, RenderSettings()) for _ in range(self.workers)]:
+            future.result()
+
+    def restart(self, generation):
+        """Replace the worker pool of generation, broken by a dying worker, unless that was done already"""
+        with self.lock:
+            if generation != self.generation:
+                return
+            broken = self.executor
+            self.executor = self.start_workers()
+            self.generation += 1
+        # Outside the lock, so cached and coalesced requests are not held up by the warm-up
+        try:
+            self.warm_up()
+        finally:
+            broken.shutdown(wait=False)
+
+    def render(self, settings):
+        """PNG bytes, render ms, encode ms and where they came from: "cache", "coalesced" or "render"
+
+        A worker dying, for instance killed for its memory, breaks the whole pool; the
+        pool is then restarted and the render tried once more before giving up with
+        ServiceUnavailable.
+        """
+        cached = self.cache.get(settings)
+        if cached is not None:
+            return cached + ("cache",)
+
+        for _ in range(2):
+            with self.lock:
+                # Checked again, as the render may have finished since the first lookup
+                cached = self.cache.get(settings)
+                if cached is not None:
+                    return cached + ("cache",)
+                future, generation = self.pending.get(settings, (None, self.generation))
+                source = "coalesced"
+                # A failed render can linger until its done callback has run
+                if future is None or (future.done() and future.exception() is not None):
+                    future, generation, source = None, self.generation, "render"
+                    try:
+                        future = self.executor.submit(render_png, settings)
+                    except BrokenProcessPool:
+                        pass
+                    else:
+                        self.pending[settings] = (future, generation)
+                        future.add_done_callback(lambda done: self.finish(settings, done))
+            if future is not None:
+                try:
+                    return future.result() + (source,)
+                except BrokenProcessPool:
+                    pass
+            try:
+                self.restart(generation)
+            except BrokenProcessPool:
+                break
+        raise ServiceUnavailable("Render workers keep failing")
+
+    def finish(self, settings, future):
+        # Cache before forgetting the pending render, so no request slips between the two and renders again
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(settings, future.result())
+        with self.lock:
+            if self.pending.get(settings, (None,))[0] is future:
+                del self.pending[settings]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def parse_value(field, text):
+    """Convert a query string value to the type of a settings field; tuples are comma separated"""
+    if field.type is bool:
+        return text.lower() in ("1", "true", "yes", "on")
+    item_type = TUPLE_ITEM_TYPES.get(field.name, field.type)
+    try:
+        if field.type is tuple:
+            return tuple(item_type(part) for part in text.split(",") if part)
+        return item_type(text)
+    except ValueError:
+        raise ValueError(f"Invalid value for {field.name}: {text!r}")
+
+
+def is_color(value):
+    """Whether value is a "#RRGGBB" string"""
+    if not isinstance(value, str) or len(value) != 7 or value[0] != "#":
+        return False
+    try:
+        int(value[1:], 16)
+    except ValueError:
+        return False
+    return True
+
+
+def check_type(name, value, expected):
+    """Raise ValueError unless value is of type expected; bools do not count as ints"""
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise ValueError(f"{name} must be of type {expected.__name__}")
+
+
+def check_settings(settings):
+    """Raise ValueError unless every field of settings has its type and lies within what a request may ask for"""
+    for field in fields(RenderSettings):
+        value = getattr(settings, field.name)
+        check_type(field.name, value, field.type)
+        if field.type is tuple:
+            for item in value:
+                check_type(field.name, item, TUPLE_ITEM_TYPES[field.name])
+        if field.name in SETTING_RANGES:
+            low, high = SETTING_RANGES[field.name]
+            if not low <= value <= high:
+                raise ValueError(f"{field.name} must be between {low} and {high}")
+        if field.name in SETTING_CHOICES and value not in SETTING_CHOICES[field.name]:
+            raise ValueError(f"{field.name} must be one of {', '.join(SETTING_CHOICES[field.name])}")
+
+    if settings.width < 1 or settings.height < 1 or settings.width * settings.height > MAX_PIXELS:
+        raise ValueError(f"Canvas must be between 1 and {MAX_PIXELS} pixels")
+    colors = settings.colors + (settings.bg_color,)
+    if len(settings.colors) > MAX_COLORS or not all(is_color(color) for color in colors):
+        raise ValueError(f"colors and bg_color must be #RRGGBB, with at most {MAX_COLORS} colors")
+    if not all(0 <= index < len(settings.colors) for index in settings.selected_colors):
+        raise ValueError("selected_colors must be indices into colors")
+    if not settings.shapes or not set(settings.shapes) <= set(SHAPES):
+        raise ValueError(f"shapes must be one or more of {', '.join(SHAPES)}")
+    if len(settings.text_content) > MAX_TEXT_LENGTH:
+        raise ValueError(f"text_content must be at most {MAX_TEXT_LENGTH} characters")
+
+
+def request_settings(data):
+    """RenderSettings from a request's parameters, raising ValueError for any value a request may not use"""
+    settings = RenderSettings.from_dict(data)
+    check_settings(settings)
+    return settings
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """POST /render with JSON settings, or GET /render?seed=...&width=..., answers with a PNG"""
+
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self.send_body(200, b"ok", "text/plain")
+            return
+        if url.path != "/render":
+            self.send_error(404)
+            return
+        types = {f.name: f for f in fields(RenderSettings)}
+        try:
+            data = {name: parse_value(types[name], value) for name, value in parse_qsl(url.query) if name in types}
+        except ValueError as e:
+            self.send_body(400, str(e).encode("utf-8"), "text/plain")
+            return
+        self.respond(data)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/render":
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object of settings")
+        except ValueError as e:
+            self.send_body(400, str(e).encode("utf-8"), "text/plain")
+            return
+        self.respond(data)
+
+    def respond(self, data):
+        start = time.perf_counter()
+        try:
+            settings = request_settings(data)
+        except (TypeError, ValueError) as e:
+            self.send_body(400, str(e).encode("utf-8"), "text/plain")
+            return
+        try:
+            png, render_ms, encode_ms, source = self.service.render(settings)
+        except ValueError as e:
+            # Settings the scene generator cannot work with, such as shapes larger than the canvas
+            self.send_body(400, str(e).encode("utf-8"), "text/plain")
+            return
+        except ServiceUnavailable as e:
+            self.send_body(503, str(e).encode("utf-8"), "text/plain")
+            return
+        except Exception as e:
+            self.send_body(500, str(e).encode("utf-8"), "text/plain")
+            return
+        total_ms = (time.perf_counter() - start) * 1000
+        self.send_body(200, png, "image/png", {
+            "X-Render-Source": source,
+            "X-Render-Time-Ms": f"{render_ms:.1f}",
+            "X-Encode-Time-Ms": f"{encode_ms:.1f}",
+            "X-Total-Time-Ms": f"{total_ms:.1f}",
+            # The same timings for browser developer tools
+            "Server-Timing": f"render;dur={render_ms:.1f}, encode;dur={encode_ms:.1f}, total;dur={total_ms:.1f}",
+        })
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(service, host="127.0.0.1", port=8000, verbose=False):
+    """HTTP server answering render requests from service, one thread per connection"""
+    handler = type("BoundRenderHandler", (RenderHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.verbose = verbose
+    return server
+
+
+def add_serve_arguments(parser):
+    """Register the serve command line options on an argparse parser"""
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=None, help="Renderer processes (default: all cores)")
+    parser.add_argument("--backend", default="qt", choices=BACKENDS,
+                        help="Rasterizer: qt, or numpy for machines without PyQt5")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_BUDGET // (1024 * 1024),
+                        help="Memory for cached PNGs in megabytes")
+    parser.add_argument("--png-compression", type=int, default=6, choices=range(10), metavar="0-9",
+                        help="PNG zlib level: 0 is fastest, 9 smallest")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+
+def main(args):
+    """Run the serve command from parsed arguments until interrupted"""
+    service = RenderService(workers=args.workers, backend=args.backend, cache_budget=args.cache_mb * 1024 * 1024,
+                            options=ExportOptions(png_compression=args.png_compression))
+    service.warm_up()
+    server = make_server(service, args.host, args.port, args.verbose)
+    sys.stdout.write(f"Serving renders on http://{args.host}:{server.server_port}/render "
+                     f"with {service.workers} workers\n")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog="server.py", description="Serve renders over HTTP")
+    add_serve_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,143 @@
+import json
+from dataclasses import dataclass, fields, asdict, replace
+
+
+DEFAULT_COLORS = ("#FF5733", "#33FF57", "#3357FF", "#F3FF33", "#FF33F3", "#33FFF3")
+
+SHAPES = ("rotated_rect", "ellipse", "polygon", "spiral", "bezier", "star", "arc", "donut", "cross",
+          "line", "text")
+
+# Primitives of the high-count mode
+DENSE_KINDS = ("Dots", "Squares", "Dashes")
+
+# Fields every layer depends on
+COMMON_FIELDS = ("width", "height", "seed")
+
+# Fields that only affect the background or texture layer; shapes depend on everything else
+BACKGROUND_FIELDS = ("bg_type", "bg_color")
+TEXTURE_FIELDS = ("texture_enabled", "texture_type", "texture_intensity")
+
+# Gradient backgrounds share the gradient settings with the shapes
+GRADIENT_FIELDS = ("gradient_type", "gradient_complexity")
+
+# Fields only the harmony palette reads, which is used when no palette color is picked
+HARMONY_FIELDS = ("hue", "harmony", "saturation", "value")
+
+# Fields the GUI offers that no renderer reads
+UNUSED_FIELDS = ("chaos",)
+
+
+@dataclass(frozen=True)
+class RenderSettings:
+    """Immutable snapshot of every parameter that affects a render"""
+    width: int = 800
+    height: int = 600
+    seed: int = 42
+
+    # Colors
+    colors: tuple = DEFAULT_COLORS
+    selected_colors: tuple = ()
+    hue: int = 180
+    harmony: str = "Complementary"
+    saturation: int = 80
+    value: int = 90
+
+    # Background
+    bg_type: str = "Random"
+    bg_color: str = "#FFFFFF"
+
+    # Shapes
+    shapes: tuple = SHAPES
+    min_size: int = 10
+    max_size: int = 150
+    min_rotation: int = 0
+    max_rotation: int = 360
+    detail: int = 8
+    text_content: str = "ABC"
+    symmetry: str = "None"
+    radial_sections: int = 6
+
+    # Effects
+    alpha_enabled: bool = True
+    min_alpha: int = 100
+    max_alpha: int = 255
+    gradient_enabled: bool = True
+    gradient_type: str = "Linear"
+    gradient_complexity: int = 3
+    stroke_enabled: bool = True
+    stroke_width: int = 2
+    stroke_color: str = "Contrast"
+    texture_enabled: bool = False
+    texture_type: str = "Noise"
+    texture_intensity: int = 30
+
+    # Render
+    complexity: int = 150
+    density: int = 50
+    chaos: int = 30
+
+    # High-count mode: dense_count small primitives replace the shapes
+    dense_enabled: bool = False
+    dense_count: int = 1000000
+    dense_kind: str = "Dots"
+    dense_size: int = 3
+
+    @property
+    def num_shapes(self):
+        """Number of shapes drawn for the current complexity and density"""
+        return int(self.complexity * (self.density / 100.0))
+
+    def picked_colors(self):
+        """Palette colors shapes are drawn with: the selected ones, or all when none is selected"""
+        return [color for i, color in enumerate(self.colors) if i in self.selected_colors or not self.selected_colors]
+
+    @property
+    def num_primitives(self):
+        """Number of shapes, or of primitives in the high-count mode"""
+        return self.dense_count if self.dense_enabled else self.num_shapes
+
+    def layer_key(self, layer):
+        """Hashable key of the fields that affect a render layer"""
+        if layer == "background":
+            names = COMMON_FIELDS + BACKGROUND_FIELDS + GRADIENT_FIELDS
+        elif layer == "texture":
+            names = COMMON_FIELDS + TEXTURE_FIELDS
+        elif layer == "shapes":
+            names = tuple(f.name for f in fields(self) if f.name not in BACKGROUND_FIELDS + TEXTURE_FIELDS)
+        else:
+            raise ValueError(f"Unknown layer: {layer}")
+        return tuple(getattr(self, name) for name in names)
+
+    def replace(self, **changes):
+        """Return a copy with some fields changed"""
+        return replace(self, **changes)
+
+    def to_dict(self):
+        """Convert to a JSON-friendly dict"""
+        data = asdict(self)
+        for key, value in data.items():
+            if isinstance(value, tuple):
+                data[key] = list(value)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build settings from a dict, ignoring unknown keys"""
+        known = {f.name for f in fields(cls)}
+        values = {}
+        for key, value in data.items():
+            if key not in known:
+                continue
+            values[key] = tuple(value) if isinstance(value, list) else value
+        return cls(**values)
+
+    @classmethod
+    def load(cls, path):
+        """Load settings from a JSON file"""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        """Save settings to a JSON file"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,22 @@
+import pytest
+
+from settings import RenderSettings, SHAPES
+from renderer import ArtRenderer
+from export import rgba_bytes
+
+
+# Qt text rendering is not deterministic from one paint to the next, so text is left out
+SHAPES_WITHOUT_TEXT = tuple(shape for shape in SHAPES if shape != "text")
+
+
+@pytest.mark.parametrize("seed", [1, 42, 1234])
+def test_culled_render_matches_unculled(seed):
+    # Opaque shapes, so there is something to cull
+    settings = RenderSettings(seed=seed, shapes=SHAPES_WITHOUT_TEXT, complexity=300, density=100,
+                              alpha_enabled=False)
+    stats = {}
+    culled = ArtRenderer(occlusion_culling=True).render(settings, stats=stats)
+    unculled = ArtRenderer().render(settings)
+
+    assert stats["culled"] > 0
+    assert rgba_bytes(culled) == rgba_bytes(unculled)
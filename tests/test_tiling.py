@@ -0,0 +1,41 @@
+import numpy as np
+
+from settings import RenderSettings
+from tiling import TiledRenderer
+from encoders import argb32_to_rgb
+
+
+# Text is laid out with timers and font caches, which only work on threads Qt started
+TEXT_SCENE = RenderSettings(width=480, height=360, seed=7, complexity=120, density=100,
+                            shapes=("text", "ellipse", "polygon"))
+
+
+def serial_pixels(tiled, settings, width, height):
+    """Paint every band on the calling thread"""
+    tiled.prepare(settings, width, height)
+    pixels = np.empty((height, width), dtype=np.uint32)
+    for y in range(0, height, tiled.band_height):
+        tiled.paint_band(pixels[y:y + tiled.band_height], y)
+    return pixels
+
+
+def test_parallel_bands_match_serial_render_with_text():
+    tiled = TiledRenderer(tile_width=150, band_height=45)
+    expected = serial_pixels(tiled, TEXT_SCENE, 600, 450)
+
+    pixels = np.empty((450, 600), dtype=np.uint32)
+    tiled.render_into(TEXT_SCENE, pixels, threads=4)
+
+    assert np.array_equal(pixels, expected)
+
+
+def test_render_to_file_streams_the_same_rows(tmp_path):
+    tiled = TiledRenderer(tile_width=150, band_height=45)
+    expected = argb32_to_rgb(serial_pixels(tiled, TEXT_SCENE, 600, 450))
+
+    path = tmp_path / "render.ppm"
+    tiled.render_to_file(TEXT_SCENE, str(path), 600, 450, threads=4)
+
+    data = path.read_bytes()
+    assert data.startswith(b"P6\n600 450\n255\n")
+    assert data[len(b"P6\n600 450\n255\n"):] == expected.tobytes()
@@ -0,0 +1,138 @@
+import numpy as np
+
+
+TEXTURE_TYPES = ("Noise", "Lines", "Dots", "Paper")
+
+# Gray level each texture is painted with
+TEXTURE_GRAY = {"Noise": 0, "Lines": 0, "Dots": 0, "Paper": 200}
+
+_SUPERSAMPLE = 8
+_disc_stamps = {}
+
+
+def disc_stamp(size):
+    """Pixel offsets and antialiased coverage of a disc drawn into a size x size box"""
+    if size not in _disc_stamps:
+        sub = (np.arange(size * _SUPERSAMPLE) + 0.5) / _SUPERSAMPLE - size / 2
+        inside = (sub[:, None] ** 2 + sub[None, :] ** 2) <= (size / 2) ** 2
+        coverage = inside.reshape(size, _SUPERSAMPLE, size, _SUPERSAMPLE).mean(axis=(1, 3))
+        dy, dx = np.nonzero(coverage)
+        _disc_stamps[size] = (dy, dx, coverage[dy, dx])
+    return _disc_stamps[size]
+
+
+def splat_discs(width, height, xs, ys, sizes, alphas):
+    """Return pixel indices and alpha values for a batch of antialiased discs"""
+    indices = []
+    values = []
+    for size in np.unique(sizes):
+        pick = sizes == size
+        dy, dx, coverage = disc_stamp(int(size))
+        px = xs[pick][:, None] + dx[None, :]
+        py = ys[pick][:, None] + dy[None, :]
+        alpha = alphas[pick][:, None] * coverage[None, :]
+        inside = (px < width) & (py < height)
+        indices.append(py[inside] * width + px[inside])
+        values.append(alpha[inside])
+    if not indices:
+        return np.zeros(0, np.int64), np.zeros(0)
+    return np.concatenate(indices), np.concatenate(values)
+
+
+def splat_lines(width, height, x1, y1, x2, y2, widths, alphas):
+    """Return pixel indices and alpha values for a batch of thick lines"""
+    if len(x1) == 0:
+        return np.zeros(0, np.int64), np.zeros(0)
+
+    # One sample per pixel along the major axis, padding short lines with their end point
+    spans = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1))
+    steps = int(np.ceil(spans.max())) + 1
+    t = np.minimum(np.arange(steps)[None, :] / np.maximum(spans[:, None], 1), 1.0)
+    px = x1[:, None] + (x2 - x1)[:, None] * t
+    py = y1[:, None] + (y2 - y1)[:, None] * t
+
+    indices = []
+    values = []
+    for line_width in np.unique(widths):
+        pick = widths == line_width
+        offsets = np.arange(line_width) - (line_width - 1) / 2
+        ox, oy = np.meshgrid(offsets, offsets)
+        sx = np.floor(px[pick][:, :, None] + ox.ravel()[None, None, :]).astype(np.int64)
+        sy = np.floor(py[pick][:, :, None] + oy.ravel()[None, None, :]).astype(np.int64)
+        line_ids = np.broadcast_to(np.flatnonzero(pick)[:, None, None], sx.shape)
+        inside = (sx >= 0) & (sx < width) & (sy >= 0) & (sy < height)
+
+        # A line covers each pixel once, however many samples land in it
+        keys = np.unique(line_ids[inside] * (width * height) + sy[inside] * width + sx[inside])
+        indices.append(keys % (width * height))
+        values.append(alphas[keys // (width * height)])
+    return np.concatenate(indices), np.concatenate(values)
+
+
+def composite_alpha(indices, alphas):
+    """Combine overlapping same-colored marks, returning touched pixels and their alpha"""
+    pixels, inverse = np.unique(indices, return_inverse=True)
+    # Stacking marks with alpha a1, a2, ... leaves 1 - prod(1 - a) coverage
+    log_transmission = np.bincount(inverse, weights=np.log1p(-np.minimum(alphas, 0.999)),
+                                   minlength=len(pixels))
+    return pixels, 1.0 - np.exp(log_transmission)
+
+
+def grid_hits(width, height, step, probability, rng):
+    """Top-left corners of the grid cells that receive a mark"""
+    columns = (width + step - 1) // step
+    rows = (height + step - 1) // step
+    hit = np.flatnonzero(rng.random(rows * columns) < probability)
+    return (hit % columns) * step, (hit // columns) * step
+
+
+def texture_alpha(width, height, texture_type, intensity, rng):
+    """Build a texture as flat pixel indices plus their alpha (0.0-1.0) with batched NumPy operations"""
+    # Adjust intensity (0-100 to 0.0-1.0)
+    intensity = intensity / 100.0
+
+    if texture_type == "Noise":
+        # Discs on a 5px grid never overlap, so no compositing is needed
+        xs, ys = grid_hits(width, height, 5, intensity * 0.3, rng)
+        sizes = rng.integers(1, 5, len(xs))
+        alphas = rng.integers(30, 101, len(xs)) / 255.0
+        return splat_discs(width, height, xs, ys, sizes, alphas)
+
+    elif texture_type == "Lines":
+        count = int(50 * intensity)
+        x1 = rng.integers(0, width + 1, count).astype(float)
+        y1 = rng.integers(0, height + 1, count).astype(float)
+        x2 = x1 + rng.integers(-50, 51, count)
+        y2 = y1 + rng.integers(-50, 51, count)
+        widths = rng.integers(1, 4, count)
+        alphas = rng.integers(30, 81, count) / 255.0
+        return composite_alpha(*splat_lines(width, height, x1, y1, x2, y2, widths, alphas))
+
+    elif texture_type == "Dots":
+        count = int(500 * intensity)
+        xs = rng.integers(0, width + 1, count)
+        ys = rng.integers(0, height + 1, count)
+        sizes = rng.integers(1, 5, count)
+        alphas = rng.integers(30, 101, count) / 255.0
+        return composite_alpha(*splat_discs(width, height, xs, ys, sizes, alphas))
+
+    elif texture_type == "Paper":
+        # Subtle paper-like texture of 2x2 specks on a 3px grid
+        xs, ys = grid_hits(width, height, 3, intensity * 0.1, rng)
+        alphas = rng.integers(5, 16, len(xs)) / 255.0
+        dy, dx = np.array([0, 0, 1, 1]), np.array([0, 1, 0, 1])
+        px = xs[:, None] + dx[None, :]
+        py = ys[:, None] + dy[None, :]
+        inside = (px < width) & (py < height)
+        return py[inside] * width + px[inside], np.broadcast_to(alphas[:, None], px.shape)[inside]
+
+    raise ValueError(f"Unknown texture type: {texture_type}")
+
+
+def create_texture(width, height, texture_type, intensity, rng):
+    """Create a texture as a (height, width) uint32 array of ARGB32 pixels"""
+    indices, alphas = texture_alpha(width, height, texture_type, intensity, rng)
+    gray = TEXTURE_GRAY[texture_type]
+    argb = np.full(width * height, (gray << 16) | (gray << 8) | gray, dtype=np.uint32)
+    argb[indices] |= np.rint(alphas * 255).astype(np.uint32) << 24
+    return argb.reshape(height, width)
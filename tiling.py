@@ -0,0 +1,234 @@
+import os
+import sys
+from collections import deque
+from dataclasses import replace
+
+import numpy as np
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtCore import Qt, QRect, QThreadPool
+
+from settings import RenderSettings
+from scene import SceneGenerator, shape_copy_bounds
+from renderer import ArtRenderer, array_to_qimage, buffer_to_qimage
+from encoders import open_stream_writer, argb32_to_rgb
+from framebuffer import FrameBuffer
+from workers import BandJob
+import texture
+
+
+# Tile sizes are kept to multiples of 15 so the 3px and 5px texture grids line up across tiles
+TEXTURE_GRID = 15
+
+
+def band_pool(threads=None):
+    """QThreadPool painting bands on threads, all cores by default"""
+    pool = QThreadPool()
+    pool.setMaxThreadCount(threads or os.cpu_count() or 1)
+    return pool
+
+
+class TiledRenderer:
+    """Renders a scene at any output size tile by tile, streaming finished rows to an encoder
+
+    Peak memory is one band of full-width rows per thread plus one, independent of the output height.
+    """
+
+    def __init__(self, renderer=None, tile_width=1020, band_height=240):
+        self.renderer = renderer or ArtRenderer()
+        self.tile_width = max(TEXTURE_GRID, tile_width // TEXTURE_GRID * TEXTURE_GRID)
+        self.band_height = max(TEXTURE_GRID, band_height // TEXTURE_GRID * TEXTURE_GRID)
+
+    def prepare(self, settings, width, height):
+        """Generate the scene once and precompute every shape's bounding box"""
+        if settings.dense_enabled:
+            raise ValueError("Tiled rendering does not support the high-count mode")
+        self.settings = settings
+        self.width = width
+        self.height = height
+        self.scale_x = width / settings.width
+        self.scale_y = height / settings.height
+        self.background = self.renderer.scene_background(settings)
+        self.shapes = self.renderer.scene_shapes(settings)
+        self.texture = SceneGenerator(settings).generate_texture()
+
+        # One bounding box per symmetry copy, so each copy is culled on its own
+        boxes = []
+        self.copies = []
+        for index, shape in enumerate(self.shapes):
+            for copy, box in enumerate(shape_copy_bounds(shape)):
+                boxes.append(box)
+                self.copies.append((index, copy))
+        bounds = np.array(boxes, dtype=float).reshape(-1, 4)
+        # Bounding boxes in output pixels
+        self.bounds = bounds * [self.scale_x, self.scale_y, self.scale_x, self.scale_y]
+
+    def visible_shapes(self, x0, y0, x1, y1):
+        """Shapes whose bounding box overlaps the output rectangle, in paint order"""
+        b = self.bounds
+        hit = (b[:, 2] >= x0) & (b[:, 0] <= x1) & (b[:, 3] >= y0) & (b[:, 1] <= y1)
+
+        visible = {}
+        for i in np.flatnonzero(hit):
+            index, copy = self.copies[i]
+            visible.setdefault(index, []).append(copy)
+
+        shapes = []
+        for index, copies in visible.items():
+            shape = self.shapes[index]
+            if shape.transforms is not None and len(copies) < len(shape.transforms):
+                # Only replay the symmetry copies that reach this tile
+                shape = replace(shape, transforms=tuple(shape.transforms[c] for c in copies))
+            shapes.append(shape)
+        return shapes
+
+    def paint_tile(self, painter, origin_x, origin_y, x, y, w, h):
+        """Paint output rectangle (x, y, w, h) into a target whose top-left is (origin_x, origin_y)"""
+        painter.save()
+        painter.setClipRect(QRect(x - origin_x, y - origin_y, w, h))
+        painter.translate(-origin_x, -origin_y)
+
+        painter.save()
+        painter.scale(self.scale_x, self.scale_y)
+        self.renderer.paint_background(painter, self.background, self.settings.width, self.settings.height)
+        painter.setRenderHint(QPainter.Antialiasing)
+        state = {}
+        for shape in self.visible_shapes(x, y, x + w, y + h):
+            self.renderer.draw_shape(painter, shape, state=state)
+        painter.restore()
+
+        if self.texture is not None:
+            painter.drawImage(x, y, self.tile_texture(x, y, w, h))
+        painter.restore()
+
+    def tile_texture(self, x, y, w, h):
+        """Texture grain for one tile at output resolution, seeded by the tile position"""
+        spec = self.texture
+        rng = np.random.default_rng([spec.seed, x, y])
+        return array_to_qimage(texture.create_texture(w, h, spec.kind, spec.intensity, rng))
+
+    def paint_band(self, rows, band_y):
+        """Paint the output rows starting at band_y into rows, a (band height, width) uint32 array"""
+        band_h, width = rows.shape
+        band = buffer_to_qimage(rows)
+        band.fill(Qt.black)
+        painter = QPainter(band)
+        try:
+            for tile_x in range(0, width, self.tile_width):
+                tile_w = min(self.tile_width, width - tile_x)
+                self.paint_tile(painter, 0, band_y, tile_x, band_y, tile_w, band_h)
+        finally:
+            painter.end()
+
+    def start_band(self, pool, rows, band_y):
+        """Queue painting the output rows starting at band_y into rows; returns a Future of band_y"""
+        job = BandJob(self, rows, band_y)
+        pool.start(job)
+        return job.future
+
+    def paint_bands(self, pixels, pool):
+        """Paint the bands covering pixels in parallel on pool
+
+        Every band paints straight into its own rows of the shared array, so nothing is copied to stitch them.
+        """
+        starts = range(0, len(pixels), self.band_height)
+        jobs = [self.start_band(pool, pixels[y:y + self.band_height], y) for y in starts]
+        # Let every band finish before a failure is raised, so none paints into pixels afterwards
+        pool.waitForDone()
+        for job in jobs:
+            job.result()
+
+    def render_into(self, settings, pixels, threads=None):
+        """Render settings into pixels, any (height, width) uint32 array such as a FrameBuffer's
+
+        Shapes and texture are painted tile by tile straight into the array, so
+        beyond it only one tile's texture per thread is allocated.
+        """
+        height, width = pixels.shape
+        self.prepare(settings, width, height)
+        self.paint_bands(pixels, band_pool(threads))
+
+    def render_image(self, settings, width, height, threads=None):
+        """Render settings at width x height into one QImage, painting bands on threads"""
+        pixels = np.empty((height, width), dtype=np.uint32)
+        self.render_into(settings, pixels, threads)
+        return array_to_qimage(pixels, QImage.Format_ARGB32_Premultiplied)
+
+    def render_framebuffer(self, settings, path, width, height, threads=None):
+        """Render settings at width x height into a new memory-mapped FrameBuffer file at path"""
+        framebuffer = FrameBuffer(path, width, height)
+        self.render_into(settings, framebuffer.pixels, threads)
+        framebuffer.flush()
+        return framebuffer
+
+    def render_to_file(self, settings, path, width, height, progress=None, threads=1):
+        """Render settings at width x height into path (.png or .ppm)
+
+        Bands are painted on up to threads threads and written in order as soon as
+        they and every band above them are done, with at most one band per thread
+        plus one in memory at once.
+        """
+        self.prepare(settings, width, height)
+        pool = band_pool(threads)
+        # One band more than there are threads, so every thread has a band while the oldest is encoded
+        in_flight = pool.maxThreadCount() + 1
+        writer = open_stream_writer(path, width, height)
+        pending = deque()
+
+        def write_oldest():
+            rows, job = pending.popleft()
+            band_y = job.result()
+            writer.write_rows(argb32_to_rgb(rows))
+            if progress:
+                progress(band_y + len(rows), height)
+
+        try:
+            for band_y in range(0, height, self.band_height):
+                if len(pending) == in_flight:
+                    write_oldest()
+                rows = np.empty((min(self.band_height, height - band_y), width), dtype=np.uint32)
+                pending.append((rows, self.start_band(pool, rows, band_y)))
+            while pending:
+                write_oldest()
+        except BaseException:
+            # Keep the original error and leave no truncated file behind
+            pool.clear()
+            pool.waitForDone()
+            writer.abort()
+            raise
+        writer.close()
+
+
+def add_tiled_arguments(parser):
+    """Register the tiled command line options on an argparse parser"""
+    parser.add_argument("--width", type=int, required=True, help="Output width in pixels")
+    parser.add_argument("--height", type=int, required=True, help="Output height in pixels")
+    parser.add_argument("--out", required=True, help="Output file (.png or .ppm)")
+    parser.add_argument("--settings", default=None, help="JSON file with render settings")
+    parser.add_argument("--seed", type=int, default=None, help="Override the seed from the settings")
+    parser.add_argument("--tile-width", type=int, default=1020, help="Tile width in pixels")
+    parser.add_argument("--band-height", type=int, default=240, help="Rows each thread renders at a time")
+    parser.add_argument("--threads", type=int, default=None, help="Bands painted in parallel (default: all cores)")
+    parser.add_argument("--framebuffer", default=None, metavar="FILE",
+                        help="Render the whole image into this memory-mapped file of raw ARGB32 pixels, "
+                             "which is kept, then encode --out from it")
+
+
+def main(args):
+    """Run the tiled command from parsed arguments"""
+    settings = RenderSettings.load(args.settings) if args.settings else RenderSettings()
+    if args.seed is not None:
+        settings = settings.replace(seed=args.seed)
+
+    def progress(done, total):
+        sys.stdout.write(f"\rRendered {done}/{total} rows")
+        sys.stdout.flush()
+
+    renderer = TiledRenderer(tile_width=args.tile_width, band_height=args.band_height)
+    if args.framebuffer:
+        with renderer.render_framebuffer(settings, args.framebuffer, args.width, args.height,
+                                         threads=args.threads) as framebuffer:
+            framebuffer.save(args.out, progress=progress)
+    else:
+        renderer.render_to_file(settings, args.out, args.width, args.height, progress=progress, threads=args.threads)
+    sys.stdout.write("\n")
+    return 0
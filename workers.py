@@ -0,0 +1,147 @@
+from concurrent.futures import Future
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from renderer import RenderCancelled
+from export import export_image
+
+
+class RenderSignals(QObject):
+    """Signals a RenderJob uses to report back to the GUI thread"""
+    preview = pyqtSignal(int, QImage)
+    # job id, image, settings and the renderer's stats dict
+    finished = pyqtSignal(int, QImage, object, object)
+    failed = pyqtSignal(int, str)
+
+
+class RenderJob(QRunnable):
+    """Renders one settings snapshot on a QThreadPool thread
+
+    is_stale(job_id) is polled while painting so a newer request can cancel
+    this one; cancelled jobs finish silently. The signals object is owned by
+    the caller so it outlives jobs that are still queued. With progressive
+    set, a low resolution draft is emitted before the full render.
+    """
+
+    def __init__(self, job_id, renderer, settings, is_stale, signals, progressive=False):
+        super().__init__()
+        self.job_id = job_id
+        self.renderer = renderer
+        self.settings = settings
+        self.is_stale = is_stale
+        self.signals = signals
+        self.progressive = progressive
+
+    def cancelled(self):
+        return self.is_stale(self.job_id)
+
+    def run(self):
+        if self.cancelled():
+            return
+        try:
+            # Skip the draft when the full render is cached or would reuse painted shapes anyway
+            fast = self.renderer.is_cached(self.settings) or self.renderer.is_shapes_cached(self.settings)
+            if self.progressive and not fast:
+                preview = self.renderer.render_preview(self.settings, cancelled=self.cancelled)
+                self.signals.preview.emit(self.job_id, preview)
+            stats = {}
+            image = self.renderer.render(self.settings, cancelled=self.cancelled, stats=stats)
+        except RenderCancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, str(e))
+            return
+        self.signals.finished.emit(self.job_id, image, self.settings, stats)
+
+
+class ExportSignals(QObject):
+    """Signals an ExportJob uses to report back to the GUI thread"""
+    # path, rows written, total rows
+    progress = pyqtSignal(str, int, int)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+
+class ExportJob(QRunnable):
+    """Encodes a finished image to a file on a QThreadPool thread, away from the GUI"""
+
+    def __init__(self, image, path, options, signals, fmt=None):
+        super().__init__()
+        self.image = image
+        self.path = path
+        self.options = options
+        self.signals = signals
+        self.fmt = fmt
+
+    def run(self):
+        try:
+            export_image(self.image, self.path, self.fmt, self.options,
+                         progress=lambda done, total: self.signals.progress.emit(self.path, done, total))
+        except Exception as e:
+            self.signals.failed.emit(self.path, str(e))
+            return
+        self.signals.finished.emit(self.path)
+
+
+class ThumbnailSignals(QObject):
+    """Signals a ThumbnailJob uses to report back to the GUI thread"""
+    # gallery generation, tile index, thumbnail
+    finished = pyqtSignal(int, int, QImage)
+    # gallery generation, tile index, error message
+    failed = pyqtSignal(int, int, str)
+
+
+class ThumbnailJob(QRunnable):
+    """Paints a quick draft of one seed for the gallery on a QThreadPool thread
+
+    Jobs of a gallery page that was replaced meanwhile return without painting;
+    seeds that cannot be drawn report why through failed.
+    """
+
+    def __init__(self, generation, index, renderer, settings, scale, is_stale, signals):
+        super().__init__()
+        self.generation = generation
+        self.index = index
+        self.renderer = renderer
+        self.settings = settings
+        self.scale = scale
+        self.is_stale = is_stale
+        self.signals = signals
+
+    def run(self):
+        if self.is_stale(self.generation):
+            return
+        try:
+            image = self.renderer.render_preview(self.settings, scale=self.scale,
+                                                 cancelled=lambda: self.is_stale(self.generation))
+        except RenderCancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, self.index, str(e))
+            return
+        self.signals.finished.emit(self.generation, self.index, image)
+
+
+class BandJob(QRunnable):
+    """Paints one band of a tiled render on a QThreadPool thread, resolving future when done
+
+    QPainter needs threads Qt started itself, as laying out text starts timers.
+    """
+
+    def __init__(self, tiled, rows, band_y):
+        super().__init__()
+        self.tiled = tiled
+        self.rows = rows
+        self.band_y = band_y
+        self.future = Future()
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            self.tiled.paint_band(self.rows, self.band_y)
+        except BaseException as e:
+            self.future.set_exception(e)
+            return
+        self.future.set_result(self.band_y)